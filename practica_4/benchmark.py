@@ -0,0 +1,113 @@
+from hardware import *
+from so import *
+from time import perf_counter
+import os
+import tempfile
+import log
+
+
+## cantidad de PCBs encolados y tamaño de cada tramo medido
+PCBS = 100000
+CHUNK = 10000
+
+
+## un dispositivo que termina al instante, para medir solo la cola del controller
+## (arranca ocupado para que se encolen todos los pedidos)
+class InstantDevice():
+
+    def __init__(self):
+        self.deviceId = "Instant"
+        self.is_idle = False
+        self.dma = False
+
+    def execute(self, operation):
+        pass
+
+
+## vacia la cola con dequeue() y retorna el tiempo (en microsegundos) por dequeue de cada tramo
+def drain(dequeue):
+    times = []
+    for chunk in range(0, PCBS // CHUNK):
+        start = perf_counter()
+        for i in range(0, CHUNK):
+            dequeue()
+        times.append((perf_counter() - start) * 1000000 / CHUNK)
+    return times
+
+def pcbs():
+    return [PCB(pid, 0, 0, NEW, (pid % 5) + 1) for pid in range(0, PCBS)]
+
+## espera promedio en la cola de la impresora con 1 a 4 replicas, para 20 procesos que imprimen a la vez (en 4 cores)
+def printerReplicas():
+    for replicas in range(1, 5):
+        HARDWARE.setup(400, virtualTime=True, eventDriven=True, cores=4, ioReplicas={"Printer": replicas})
+        kernel = Kernel()
+        HARDWARE.cpu.enable_stats = False   # sin diagrama de Gantt
+        for i in range(0, 20):
+            kernel.run(Program("print{i}.exe".format(i=i), [ASM.CPU(1), ASM.IO("Printer"), ASM.CPU(1)]), 1)
+        HARDWARE.clock.do_events(200)
+        stats = kernel.ioDeviceControllerFor("Printer").stats()
+        print("Printer x{replicas}: average wait {averageWait:5.1f} ticks, max wait {maxWait:3d} ticks".format(replicas=replicas, **stats))
+
+## latencia de los pedidos al disco (promedio y p99) con cada politica, para 40 procesos que leen 2 veces cilindros al azar
+def diskPolicies():
+    for policy in [FCFS, SSTF, SCAN, C_LOOK]:
+        HARDWARE.setup(1000, virtualTime=True, eventDriven=True, cores=4)
+        kernel = Kernel(ioPolicies={"Disk": policy})
+        HARDWARE.cpu.enable_stats = False   # sin diagrama de Gantt
+        for i in range(0, 40):
+            kernel.run(Program("disk{i}.exe".format(i=i), [ASM.CPU(1), ASM.IO("Disk"), ASM.CPU(1), ASM.IO("Disk"), ASM.CPU(1)]), 1)
+        HARDWARE.clock.do_events(1000)
+        stats = kernel.ioDeviceControllerFor("Disk").stats()
+        print("Disk {policy:<6}: average latency {averageLatency:5.1f} ticks, p99 latency {p99Latency:3d} ticks".format(**stats))
+
+## 20 procesos que escriben su memoria 3 veces en un dispositivo de bloques: el DMA mueve las celdas y la cpu sigue con otros procesos
+def dmaTransfers():
+    for bandwidth in [4, 16, 64]:
+        device = BlockIODevice(os.path.join(tempfile.mkdtemp(), "block"), blocks = 64, blockSize = 64)
+        HARDWARE.setup(2000, virtualTime=True, eventDriven=True, cores=4, ioDevices=[PrinterIODevice(), device], dmaBandwidth=bandwidth)
+        kernel = Kernel()
+        HARDWARE.cpu.enable_stats = False   # sin diagrama de Gantt
+        for i in range(0, 20):
+            kernel.run(Program("dump{i}.exe".format(i=i), (ASM.CPU(20) + [ASM.IO("Block", i)]) * 3), 1)
+        HARDWARE.clock.do_events(2000)
+        stats = kernel.ioDeviceControllerFor("Block").stats()
+        print("DMA {bandwidth:2d} cells/tick: {cells} cells moved, average latency {averageLatency:5.1f} ticks, p99 latency {p99Latency:3d} ticks".format(bandwidth=bandwidth, cells=HARDWARE.dma.cellsMoved, **stats))
+        device.close()
+
+def report(name, times):
+    print("{name:<28} first: {first:6.3f} us  last: {last:6.3f} us  total: {total:8.1f} ms".format(name=name, first=times[0], last=times[-1], total=sum(times) * CHUNK / 1000))
+
+
+##
+##  BENCHMARK: costo de sacar de las colas con 100k procesos esperando
+##  (el costo por dequeue del primer y del ultimo tramo deberia ser el mismo)
+##
+if __name__ == '__main__':
+    log.setupLogger()
+    log.logger.disabled = True
+    HARDWARE.setup(25, virtualTime=True)
+
+    baseline = pcbs()
+    report("list.pop(0) (antes)", drain(lambda: baseline.pop(0)))
+
+    scheduler = SchedulerFiFo()
+    for pcb in pcbs():
+        scheduler.add(pcb)
+    report("SchedulerFiFo", drain(scheduler.nextInQueue))
+
+    scheduler = SchedulerPriorityNoExp(140)
+    for pcb in pcbs():
+        scheduler.add(pcb)
+    report("SchedulerPriorityNoExp(140)", drain(scheduler.nextInQueue))
+
+    device = InstantDevice()
+    controller = IoDeviceController(device)
+    for pcb in pcbs():
+        controller.runOperation(pcb, INSTRUCTION_IO)
+    device.is_idle = True
+    report("IoDeviceController", drain(controller.getFinishedPCB))
+
+    printerReplicas()
+    diskPolicies()
+    dmaTransfers()
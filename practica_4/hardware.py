@@ -2,7 +2,14 @@
 
 from tabulate import tabulate
 from time import sleep
-from threading import Thread, Lock
+from threading import Thread, Lock, current_thread
+import asyncio
+import heapq
+import math
+import mmap
+import os
+import random
+from collections import OrderedDict, deque
 import log
 
 ##  Estas son la instrucciones soportadas por nuestro CPU
@@ -10,6 +17,28 @@ INSTRUCTION_IO = 'IO'
 INSTRUCTION_CPU = 'CPU'
 INSTRUCTION_EXIT = 'EXIT'
 
+##  An IO instruction can name its target device: 'IO:Disk' (plain 'IO' goes to the default device)
+##  and the disk cylinder it accesses: 'IO:Disk@120'
+##  the cylinder is an operand: it is not encoded in the opcode (every 'IO:Disk@N' runs as 'IO:Disk'),
+##  the kernel reads it from the program of the process
+IO_DEVICE_SEPARATOR = ':'
+IO_CYLINDER_SEPARATOR = '@'
+DEFAULT_IO_DEVICE = "Printer"
+
+##  Codigos de operacion (1 byte) de las instrucciones, usados por la memoria compacta
+OPCODE_EMPTY = 0
+OPCODE_CPU = 1
+OPCODE_IO = 2
+OPCODE_EXIT = 3
+##  IO instructions with a device: a fixed opcode per device type, so the bytes kept in files (the mapped memory,
+##  the swap, the block devices) mean the same in every run (a new device type needs its entry here)
+OPCODE_DEVICE_IO = 16
+DEVICE_OPCODES = {"Printer": 16, "Disk": 17, "Network": 18, "File": 19, "Block": 20}
+
+_OPCODES = {'': OPCODE_EMPTY, INSTRUCTION_CPU: OPCODE_CPU, INSTRUCTION_IO: OPCODE_IO, INSTRUCTION_EXIT: OPCODE_EXIT}
+_OPCODES.update({INSTRUCTION_IO + IO_DEVICE_SEPARATOR + device: opcode for device, opcode in DEVICE_OPCODES.items()})
+_INSTRUCTIONS = {opcode: instruction for instruction, opcode in _OPCODES.items()}
+
 
 ## Helper for emulated machine code
 class ASM():
@@ -19,8 +48,12 @@ class ASM():
         return [INSTRUCTION_EXIT] * times
 
     @classmethod
-    def IO(self):
-        return INSTRUCTION_IO
+    def IO(self, device = None, cylinder = None):
+        if device is None:
+            return INSTRUCTION_IO
+        if cylinder is None:
+            return INSTRUCTION_IO + IO_DEVICE_SEPARATOR + device
+        return INSTRUCTION_IO + IO_DEVICE_SEPARATOR + device + IO_CYLINDER_SEPARATOR + str(cylinder)
 
     @classmethod
     def CPU(self, times):
@@ -32,7 +65,60 @@ class ASM():
 
     @classmethod
     def isIO(self, instruction):
-        return INSTRUCTION_IO == instruction
+        return (INSTRUCTION_IO == instruction) or instruction.startswith(INSTRUCTION_IO + IO_DEVICE_SEPARATOR)
+
+    ## returns the device an IO instruction goes to (None for the default device)
+    @classmethod
+    def device(self, instruction):
+        if instruction == INSTRUCTION_IO:
+            return None
+        return instruction[len(INSTRUCTION_IO + IO_DEVICE_SEPARATOR):].split(IO_CYLINDER_SEPARATOR)[0]
+
+    ## returns the cylinder an IO instruction accesses (None if it doesn't name one)
+    @classmethod
+    def cylinder(self, instruction):
+        if IO_CYLINDER_SEPARATOR not in instruction:
+            return None
+        return int(instruction.split(IO_CYLINDER_SEPARATOR)[1])
+
+    ## returns the instruction without its cylinder (the part the opcode encodes)
+    @classmethod
+    def withoutCylinder(self, instruction):
+        return instruction.split(IO_CYLINDER_SEPARATOR)[0]
+
+    ## returns the opcode of an instruction (opcodes are returned as they are)
+    @classmethod
+    def opcode(self, instruction):
+        if isinstance(instruction, int):
+            return instruction
+        opcode = _OPCODES.get(instruction)
+        if opcode is None:
+            opcode = _OPCODES.get(self.withoutCylinder(instruction))
+            if opcode is None:
+                if self.isIO(instruction):
+                    raise Exception("IO device {device} has no opcode (see DEVICE_OPCODES)".format(device = self.device(instruction)))
+                raise Exception("Unknown instruction {instr}".format(instr = instruction))
+        return opcode
+
+    @classmethod
+    def isIOOpcode(self, opcode):
+        return (opcode == OPCODE_IO) or ((opcode >= OPCODE_DEVICE_IO) and (opcode in _INSTRUCTIONS))
+
+    @classmethod
+    def instruction(self, opcode):
+        if opcode not in _INSTRUCTIONS:
+            raise Exception("Unknown opcode {opcode}".format(opcode = opcode))
+        return _INSTRUCTIONS[opcode]
+
+    ## encodes a list of instructions as one byte per instruction
+    @classmethod
+    def encode(self, instructions):
+        return bytes(map(self.opcode, instructions))
+
+    ## decodes bytes to instructions, a byte that is not an opcode (ie: data) stays as it is
+    @classmethod
+    def decode(self, data):
+        return [_INSTRUCTIONS.get(opcode, opcode) for opcode in data]
 
 
 ##  Estas son la interrupciones soportadas por nuestro Kernel
@@ -42,18 +128,26 @@ IO_OUT_INTERRUPTION_TYPE = "#IO_OUT"
 NEW_INTERRUPTION_TYPE = "#NEW"
 TIMEOUT_INTERRUPTION_TYPE = "#TIMEOUT"
 STAT_INTERRUPTION_TYPE = "#STAT"
+PAGE_FAULT_INTERRUPTION_TYPE = "#PAGE_FAULT"
+DMA_INTERRUPTION_TYPE = "#DMA"
 
 ## emulates an Interrupt request
+##  core: the cpu core that raised the interruption (None for devices)
 class IRQ:
 
-    def __init__(self, type, parameters = None):
+    def __init__(self, type, parameters = None, core = None):
         self._type = type
         self._parameters = parameters
+        self._core = core
 
     @property
     def parameters(self):
         return self._parameters
 
+    @property
+    def core(self):
+        return self._core
+
     @property
     def type(self):
         return self._type
@@ -65,6 +159,8 @@ class InterruptVector():
     def __init__(self):
         self._handlers = dict()
         self.lock = Lock()
+        ## interruptions posted by asynchronous devices, handled when the cpu drains them
+        self._pending = deque()
 
     def register(self, interruptionType, interruptionHandler):
         self._handlers[interruptionType] = interruptionHandler
@@ -82,52 +178,212 @@ class InterruptVector():
             irqHandler.execute(irq)
         self.lock.release()
 
+    ## queues the irq to be handled at the next instruction boundary (can be called from any thread)
+    ##  acknowledge: called right before the irq is handled (ie: a device is released when its interruption is taken)
+    def post(self, irq, acknowledge = None):
+        self._pending.append((irq, acknowledge))
+
+    ## handles the posted interruptions, in the order they were posted
+    def drain(self):
+        while self._pending:
+            irq, acknowledge = self._pending.popleft()
+            if acknowledge is not None:
+                acknowledge()
+            self.handle(irq)
+
+    @property
+    def hasPending(self):
+        return len(self._pending) > 0
+
 
 ## emulates the Internal Clock
+##  - wall-clock mode (default): waits 1 second between ticks, useful for demos
+##  - virtual-time mode: ticks run back to back, as fast as the host can run them
+##  - event-driven mode: the clock jumps straight to the next interesting tick.
+##    Every subscriber may declare nextEventTick(tickNbr) (the next tick where it
+##    needs attention, None if it is idle) and skipTicks(ticks) (to account for
+##    the ticks that were jumped). Subscribers without nextEventTick get every tick.
 class Clock():
 
-    def __init__(self):
+    def __init__(self, virtualTime = False, eventDriven = False):
         self._subscribers = []
         self._running = False
         self._currentTick = 0
+        self._virtualTime = virtualTime
+        self._eventDriven = eventDriven
+        ## priority queue of (tick, seq, action) for one-shot events (ie: program arrivals)
+        self._events = []
+        self._eventSeq = 0
+        self._thread = None
 
     def addSubscriber(self, subscriber):
         self._subscribers.append(subscriber)
 
+    ## runs action() at the beginning of the given tick (before notifying subscribers)
+    def schedule(self, tick, action):
+        heapq.heappush(self._events, (tick, self._eventSeq, action))
+        self._eventSeq += 1
+
     def stop(self):
         self._running = False
 
+    ## waits for the thread started by start() to finish its last tick
+    def join(self):
+        if (self._thread is not None) and (self._thread is not current_thread()):
+            self._thread.join()
+
     def start(self):
         if not self._running:
             log.logger.info("---- :::: START CLOCK  ::: -----")
             self._running = True
-            t = Thread(target=self.__start)
-            t.start()
+            self._thread = Thread(target=self.__start)
+            self._thread.start()
 
     def __start(self):
         tickNbr = 0
         while (self._running):
+            if self._eventDriven:
+                tickNbr = self.__skipIdleTicks(tickNbr)
             self.tick(tickNbr)
             tickNbr += 1
 
     def tick(self, tickNbr):
         self._currentTick = tickNbr
         log.logger.info("        --------------- tick: {tickNbr} ---------------".format(tickNbr = tickNbr))
+        ## fire the scheduled events that are due
+        self.__fireEvents(tickNbr)
         ## notify all subscriber that a new clock cycle has started
         for subscriber in self._subscribers:
             subscriber.tick(tickNbr)
-        ## wait 1 second and keep looping
-        sleep(1)
+        ## wait 1 second and keep looping (only in wall-clock mode)
+        self._waitNextTick()
+
+    def _waitNextTick(self):
+        if not self._virtualTime:
+            sleep(1)
 
     def do_ticks(self, times):
         log.logger.info("---- :::: CLOCK do_ticks: {times} ::: -----".format(times=times))
         for tickNbr in range(0, times):
             self.tick(tickNbr)
 
+    ## same as do_ticks, but only the interesting ticks are executed
+    def do_events(self, times):
+        log.logger.info("---- :::: CLOCK do_events: {times} ::: -----".format(times=times))
+        tickNbr = 0
+        while tickNbr < times:
+            tickNbr = self.__skipIdleTicks(tickNbr, times)
+            if tickNbr < times:
+                self.tick(tickNbr)
+                tickNbr += 1
+
+    ## returns the next tick (>= tickNbr) where something has to happen, or None if nothing is pending
+    def nextEventTick(self, tickNbr):
+        nextTick = None
+        if self._events:
+            nextTick = max(self._events[0][0], tickNbr)
+        for subscriber in self._subscribers:
+            if hasattr(subscriber, 'nextEventTick'):
+                subscriberTick = subscriber.nextEventTick(tickNbr)
+            else:
+                subscriberTick = tickNbr
+            if (subscriberTick is not None) and (nextTick is None or subscriberTick < nextTick):
+                nextTick = subscriberTick
+            if nextTick == tickNbr:
+                break
+        return nextTick
+
+    def __skipIdleTicks(self, tickNbr, limit = None):
+        nextTick = self.nextEventTick(tickNbr)
+        if nextTick is None:
+            ## nothing pending: jump to the limit (or keep ticking one by one)
+            nextTick = tickNbr if limit is None else limit
+        elif limit is not None:
+            nextTick = min(nextTick, limit)
+
+        if nextTick > tickNbr:
+            log.logger.info("        --------------- skip ticks: {fromTick} to {toTick} ---------------".format(fromTick = tickNbr, toTick = nextTick - 1))
+            self._currentTick = nextTick - 1
+            for subscriber in self._subscribers:
+                subscriber.skipTicks(nextTick - tickNbr)
+        return nextTick
+
+    def __fireEvents(self, tickNbr):
+        while self._events and self._events[0][0] <= tickNbr:
+            tick, seq, action = heapq.heappop(self._events)
+            action()
+
     @property
     def currentTick(self):
         return self._currentTick
 
+    @property
+    def virtualTime(self):
+        return self._virtualTime
+
+    @virtualTime.setter
+    def virtualTime(self, virtualTime):
+        self._virtualTime = virtualTime
+
+    @property
+    def eventDriven(self):
+        return self._eventDriven
+
+    @eventDriven.setter
+    def eventDriven(self, eventDriven):
+        self._eventDriven = eventDriven
+
+
+## emulates the Internal Clock as an asyncio task (async hardware mode)
+##  the asynchronous devices are coroutines that wait ticks (waitTicks) or real I/O, and
+##  post their interruptions to the interrupt vector, the cpu drains them at the instruction boundaries
+class AsyncClock(Clock):
+
+    def __init__(self, virtualTime = False):
+        super(AsyncClock, self).__init__(virtualTime)
+        ## priority queue of (tick, order, seq, future) of the coroutines waiting for a tick
+        self._waiters = []
+        self._waiterSeq = 0
+
+    ## a future that is done at the beginning of the tick that is the given amount of ticks ahead
+    ##  order: the waiters of the same tick are woken up by order (then by arrival)
+    def waitTicks(self, ticks, order = 0):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (self._currentTick + ticks, order, self._waiterSeq, future))
+        self._waiterSeq += 1
+        return future
+
+    ## runs the given amount of ticks (None: until stop())
+    async def run(self, times = None):
+        log.logger.info("---- :::: CLOCK async run: {times} ::: -----".format(times=times))
+        self._running = True
+        tickNbr = 0
+        while self._running and ((times is None) or (tickNbr < times)):
+            ## the coroutines waiting for this tick run (and post their interruptions) before the cpu cycle
+            self._currentTick = tickNbr
+            while self._waiters and self._waiters[0][0] <= tickNbr:
+                tick, order, seq, future = heapq.heappop(self._waiters)
+                future.set_result(tickNbr)
+            await asyncio.sleep(0)
+            self.tick(tickNbr)
+            tickNbr += 1
+            ## let the devices work between ticks (1 second in wall-clock mode)
+            await asyncio.sleep(0 if self._virtualTime else 1)
+        self._running = False
+
+    ## switchOn: the event loop runs on its own thread until stop()
+    def start(self):
+        if not self._running:
+            log.logger.info("---- :::: START ASYNC CLOCK  ::: -----")
+            self._running = True
+            self._thread = Thread(target=lambda: asyncio.run(self.run()))
+            self._thread.start()
+
+    ## the waiting between ticks is done by run(), without blocking the event loop
+    def _waitNextTick(self):
+        pass
+
+
 ## emulates the main memory (RAM)
 class Memory():
 
@@ -141,6 +397,28 @@ class Memory():
     def read(self, addr):
         return self._cells[addr]
 
+    ## reads count consecutive cells starting at addr
+    def readBlock(self, addr, count):
+        return self._cells[addr:addr + count]
+
+    ## writes consecutive cells starting at addr
+    def writeBlock(self, addr, values):
+        if (addr + len(values) > self._size):
+            raise Exception("Memory overflow, can't write {count} cells at address {addr}, memory size: {size}".format(count = len(values), addr = addr, size = self._size))
+        self._cells[addr:addr + len(values)] = values
+
+    ## True if the cells hold opcodes instead of instructions
+    @property
+    def compact(self):
+        return False
+
+    ## nothing to do, the cells live in the python heap
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
     @property
     def size(self):
         return self._size
@@ -149,13 +427,204 @@ class Memory():
         return tabulate(enumerate(self._cells), tablefmt='psql')
         ##return "Memoria = {mem}".format(mem=self._cells)
 
+## emulates the main memory (RAM) storing a 1 byte opcode per cell
+class CompactMemory(Memory):
+
+    def __init__(self, size):
+        self._size = size
+        self._cells = bytearray(size)
+
+    def write(self, addr, value):
+        self._cells[addr] = ASM.opcode(value)
+
+    ## values can be instructions or already encoded opcodes (bytes)
+    def writeBlock(self, addr, values):
+        if not isinstance(values, (bytes, bytearray)):
+            values = ASM.encode(values)
+        super(CompactMemory, self).writeBlock(addr, values)
+
+    @property
+    def compact(self):
+        return True
+
+    def __repr__(self):
+        return tabulate(enumerate(ASM.decode(self._cells)), tablefmt='psql')
+
+## emulates the main memory (RAM) on a memory-mapped file (1 byte opcode per cell)
+##  the cells don't need to fit in the python heap, and after a flush()
+##  the backing file is a plain dump of the RAM
+##  the RAM is empty when the hardware is set up: an existing backing file is truncated (its content is lost)
+class MappedMemory(CompactMemory):
+
+    def __init__(self, size, path):
+        self._size = size
+        self._path = path
+        self._file = open(path, 'w+b')
+        self._file.truncate(size)
+        self._cells = mmap.mmap(self._file.fileno(), size)
+
+    @property
+    def path(self):
+        return self._path
+
+    def flush(self):
+        self._cells.flush()
+
+    def close(self):
+        self._cells.close()
+        self._file.close()
+
+## emulates an entry of a page table
+##  frame: None if the page is not in memory
+##  referenced / dirty: set by the MMU when the page is read / written
+##  swapSlot: slot of the swap device that holds a copy of the page (or None)
+class PageTableEntry():
+
+    def __init__(self):
+        self._frame = None
+        self._referenced = False
+        self._dirty = False
+        self._swapSlot = None
+
+    @property
+    def frame(self):
+        return self._frame
+
+    @frame.setter
+    def frame(self, frame):
+        self._frame = frame
+
+    @property
+    def isResident(self):
+        return self._frame is not None
+
+    @property
+    def referenced(self):
+        return self._referenced
+
+    @referenced.setter
+    def referenced(self, referenced):
+        self._referenced = referenced
+
+    @property
+    def dirty(self):
+        return self._dirty
+
+    @dirty.setter
+    def dirty(self, dirty):
+        self._dirty = dirty
+
+    @property
+    def swapSlot(self):
+        return self._swapSlot
+
+    @swapSlot.setter
+    def swapSlot(self, swapSlot):
+        self._swapSlot = swapSlot
+
+    def __repr__(self):
+        return "PTE(frame={frame})".format(frame = self._frame)
+
+
+##  Politicas de reemplazo de la TLB
+TLB_LRU = "LRU"
+TLB_FIFO = "FIFO"
+
+## emulates a Translation Lookaside Buffer: a small cache of page -> page table entry translations
+##  - tagged: the entries are tagged with the pid, a context switch keeps them
+##  - not tagged: a context switch flushes the whole TLB
+class TLB():
+
+    def __init__(self, entries, policy = TLB_LRU, tagged = True):
+        self._entries = entries
+        self._policy = policy
+        self._tagged = tagged
+        self._cache = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def tagged(self):
+        return self._tagged
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    @property
+    def hitRate(self):
+        lookups = self._hits + self._misses
+        if lookups == 0:
+            return 0
+        return self._hits / lookups
+
+    ## returns the cached page table entry or None (miss)
+    def lookup(self, pid, page):
+        key = (pid, page)
+        entry = self._cache.get(key)
+        if entry is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+            if self._policy == TLB_LRU:
+                self._cache.move_to_end(key)
+        return entry
+
+    def insert(self, pid, page, entry):
+        key = (pid, page)
+        if (key not in self._cache) and (len(self._cache) >= self._entries):
+            ## the first entry is the oldest one (FIFO) or the least recently used (LRU)
+            self._cache.popitem(last = False)
+        self._cache[key] = entry
+
+    ## lookups that hit the entry that was just looked up (they don't change the order of the entries)
+    def repeatHits(self, times):
+        self._hits += times
+
+    def switchContext(self, pid):
+        if not self._tagged:
+            self.flush()
+
+    def flush(self):
+        self._cache.clear()
+
+    ## removes the entries of a process (or only one of its pages)
+    def invalidate(self, pid, page = None):
+        if page is not None:
+            self._cache.pop((pid, page), None)
+        else:
+            for key in [key for key in self._cache if key[0] == pid]:
+                del self._cache[key]
+
+    def stats(self):
+        return {'entries': self._entries, 'policy': self._policy, 'hits': self._hits, 'misses': self._misses, 'hitRate': self.hitRate}
+
+    def __repr__(self):
+        return "TLB({policy}, {entries} entries) hits: {hits} misses: {misses}".format(policy = self._policy, entries = self._entries, hits = self._hits, misses = self._misses)
+
+
 ## emulates the Memory Management Unit (MMU)
+##  - contiguous mode (default): physical address = baseDir + logical address
+##  - paged mode (frameSize): the logical address is split in page/offset and the
+##    page is translated to a frame with the page table of the current process,
+##    looking first in the TLB (if the hardware has one). A page that is not
+##    resident raises a #PAGE_FAULT so the kernel can load it.
 class MMU():
 
-    def __init__(self, memory):
+    def __init__(self, memory, frameSize = None, tlb = None, interruptVector = None, core = 0):
         self._memory = memory
+        self._interruptVector = interruptVector
+        self._core = core
         self._baseDir = 0
         self._limit = 999
+        self._frameSize = frameSize
+        self._pageTable = None
+        self._pid = None
+        self._tlb = tlb
 
     @property
     def limit(self):
@@ -173,62 +642,215 @@ class MMU():
     def baseDir(self, baseDir):
         self._baseDir = baseDir
 
+    @property
+    def frameSize(self):
+        return self._frameSize
+
+    @property
+    def pageTable(self):
+        return self._pageTable
+
+    @property
+    def tlb(self):
+        return self._tlb
+
+    ## sets the page table of the process that is going to run
+    def switchContext(self, pid, pageTable):
+        self._pid = pid
+        self._pageTable = pageTable
+        if self._tlb is not None:
+            self._tlb.switchContext(pid)
+
+    ## the translations of the process (or page) are not valid anymore
+    def invalidate(self, pid, page = None):
+        if self._tlb is not None:
+            self._tlb.invalidate(pid, page)
+
     def fetch(self,  logicalAddress):
         if (logicalAddress > self._limit):
             raise Exception("Invalid Address,  {logicalAddress} is higher than process limit: {limit}".format(limit = self._limit, logicalAddress = logicalAddress))
 
-        physicalAddress = logicalAddress + self._baseDir
+        physicalAddress = self.translate(logicalAddress)
         return self._memory.read(physicalAddress)
 
+    ## writes a cell of the current process (the page gets dirty)
+    def write(self, logicalAddress, value):
+        if (logicalAddress > self._limit):
+            raise Exception("Invalid Address,  {logicalAddress} is higher than process limit: {limit}".format(limit = self._limit, logicalAddress = logicalAddress))
+
+        physicalAddress = self.translate(logicalAddress, True)
+        self._memory.write(physicalAddress, value)
+
+    def translate(self, logicalAddress, write = False):
+        if self._frameSize is None:
+            return logicalAddress + self._baseDir
+        page, offset = divmod(logicalAddress, self._frameSize)
+        entry = None
+        if self._tlb is not None:
+            entry = self._tlb.lookup(self._pid, page)
+        if entry is None:
+            ## TLB miss: page table walk
+            entry = self._pageTable[page]
+            if not entry.isResident:
+                ## page fault: the kernel loads the page and updates the page table
+                pageFaultIRQ = IRQ(PAGE_FAULT_INTERRUPTION_TYPE, page, self._core)
+                self._interruptVector.handle(pageFaultIRQ)
+            if self._tlb is not None:
+                self._tlb.insert(self._pid, page, entry)
+        entry.referenced = True
+        if write:
+            entry.dirty = True
+        return entry.frame * self._frameSize + offset
+
+    ## reads a cell without side effects (no TLB lookup, referenced bit or page fault), None if its page is not resident
+    def peek(self, logicalAddress):
+        if self._frameSize is None:
+            return self._memory.read(logicalAddress + self._baseDir)
+        page, offset = divmod(logicalAddress, self._frameSize)
+        entry = self._pageTable[page]
+        if not entry.isResident:
+            return None
+        return self._memory.read(entry.frame * self._frameSize + offset)
+
+    ## count cells from logicalAddress were fetched in one jump (cpu burst): the TLB and the referenced bits end up
+    ##  as if they were fetched one by one (a translation per page, the other cells of the page hit its TLB entry)
+    def touch(self, logicalAddress, count):
+        if self._frameSize is None:
+            return
+        end = logicalAddress + count
+        while logicalAddress < end:
+            pageEnd = min(end, (logicalAddress // self._frameSize + 1) * self._frameSize)
+            self.translate(logicalAddress)
+            if self._tlb is not None:
+                self._tlb.repeatHits(pageEnd - logicalAddress - 1)
+            logicalAddress = pageEnd
+
+    ## True if the address can be read without a page fault
+    def isResident(self, logicalAddress):
+        if self._frameSize is None:
+            return True
+        return self._pageTable[logicalAddress // self._frameSize].isResident
+
 
 ## emulates the main Central Processor Unit
+##  burstMode: with an event-driven clock, a whole run of consecutive CPU instructions
+##  is executed in one step (it stops before the next IO/EXIT instruction, and the
+##  clock stops it at the timer quantum or at the next pending interrupt)
 class Cpu():
 
-    def __init__(self, mmu, interruptVector):
+    def __init__(self, mmu, interruptVector, core = 0):
         self._mmu = mmu
         self._interruptVector = interruptVector
+        self._core = core
         self._pc = -1
         self._ir = None
+        self._opcode = None
         self._enable_stats = False
-    
+        self._burstMode = False
+        self._burstEnd = -1
+        self._stallTicks = 0
+        self._ticks = 0
+        self._busyTicks = 0
+
 
     def tick(self, tickNbr):
         self._stats()
+        self._ticks += 1
         if (self.isBusy()):
+            self._busyTicks += 1
+            if self._stallTicks > 0:
+                self._stallTicks -= 1
+                log.logger.info("cpu {core} - STALL, PC={pc}".format(core=self._core, pc=self._pc))
+                return
             self._fetch()
             self._decode()
             self._execute()
         else:
-            log.logger.info("cpu - NOOP")
+            log.logger.info("cpu {core} - NOOP".format(core=self._core))
+
+    ## the cpu is busy but doesn't execute for the given ticks (ex: warming up caches after a migration)
+    def stall(self, ticks):
+        self._stallTicks += ticks
+
+    ## event-driven clock: a busy cpu needs every tick (unless it is stalled or can run a burst)
+    def nextEventTick(self, tickNbr):
+        if self.isBusy():
+            if self._burstMode:
+                return tickNbr + self._stallTicks + self._burstLength()
+            return tickNbr + self._stallTicks
+        return None
+
+    ## event-driven clock: the skipped ticks are idle ticks, stalled ticks or CPU instructions of a burst
+    def skipTicks(self, ticks):
+        self._ticks += ticks
+        if self.isBusy():
+            self._busyTicks += ticks
+            stalled = min(ticks, self._stallTicks)
+            self._stallTicks -= stalled
+            burst = ticks - stalled
+            if burst > 0:
+                log.logger.info("cpu {core} - Exec burst: {ticks} x {instr}, PC={pc}, MMU={mmu}".format(core=self._core,
+                                                                                              ticks=burst,
+                                                                                              instr=INSTRUCTION_CPU,
+                                                                                              pc=self._pc,
+                                                                                              mmu=self._mmu.baseDir))
+                self._mmu.touch(self._pc, burst)
+                self._pc += burst
+                self._ir = INSTRUCTION_CPU
+                self._opcode = OPCODE_CPU
+        self._stats(ticks)
+
+    ## amount of consecutive CPU instructions starting at the current pc
+    def _burstLength(self):
+        if self._burstEnd < self._pc:
+            end = self._pc
+            ## a burst never crosses into a page that is not loaded, the page fault happens in a regular tick
+            ## peek: looking ahead is not a fetch (the TLB stats and the referenced bits are not touched)
+            while (end <= self._mmu.limit):
+                cell = self._mmu.peek(end)
+                if (cell is None) or (ASM.opcode(cell) != OPCODE_CPU):
+                    break
+                end += 1
+            self._burstEnd = end
+        return self._burstEnd - self._pc
 
     def _fetch(self):
         self._ir = self._mmu.fetch(self._pc)
         self._pc += 1
 
     def _decode(self):
-        ## decode no hace nada en este caso
-        pass
+        ## the memory can hold instructions or opcodes, the cpu works with opcodes
+        self._opcode = ASM.opcode(self._ir)
 
-    def _stats(self):
+    def _stats(self, ticks = 1):
         if self._enable_stats:
-            statsIRQ = IRQ(STAT_INTERRUPTION_TYPE)
+            statsIRQ = IRQ(STAT_INTERRUPTION_TYPE, ticks, self._core)
             self._interruptVector.handle(statsIRQ)
 
     def _execute(self):
-        if ASM.isEXIT(self._ir):
-            killIRQ = IRQ(KILL_INTERRUPTION_TYPE)
+        if self._opcode == OPCODE_EXIT:
+            killIRQ = IRQ(KILL_INTERRUPTION_TYPE, None, self._core)
             self._interruptVector.handle(killIRQ)
-        elif ASM.isIO(self._ir):
-            ioInIRQ = IRQ(IO_IN_INTERRUPTION_TYPE, self._ir)
+        elif ASM.isIOOpcode(self._opcode):
+            ioInIRQ = IRQ(IO_IN_INTERRUPTION_TYPE, ASM.instruction(self._opcode), self._core)
             self._interruptVector.handle(ioInIRQ)
         else:
-            log.logger.info("cpu - Exec: {instr}, PC={pc}, MMU={mmu}".format(instr=self._ir,
+            log.logger.info("cpu {core} - Exec: {instr}, PC={pc}, MMU={mmu}".format(core=self._core,
+                                                                             instr=ASM.instruction(self._opcode),
                                                                              pc=self._pc,
-                                                                             mmu=HARDWARE.mmu.baseDir))
+                                                                             mmu=self._mmu.baseDir))
 
     def isBusy(self):
         return self._pc > -1
 
+    @property
+    def core(self):
+        return self._core
+
+    @property
+    def mmu(self):
+        return self._mmu
+
     @property
     def pc(self):
         return self._pc
@@ -236,6 +858,23 @@ class Cpu():
     @pc.setter
     def pc(self, addr):
         self._pc = addr
+        self._burstEnd = -1
+        self._stallTicks = 0
+
+    ## fraction of the ticks the cpu was busy (running or stalled)
+    @property
+    def utilization(self):
+        if self._ticks == 0:
+            return 0
+        return self._busyTicks / self._ticks
+
+    @property
+    def burstMode(self):
+        return self._burstMode
+
+    @burstMode.setter
+    def burstMode(self, burstMode):
+        self._burstMode = burstMode
 
     @property
     def enable_stats(self):
@@ -246,20 +885,36 @@ class Cpu():
         self._enable_stats = enable_stats
 
     def __repr__(self):
-        return "CPU(PC={pc})".format(pc=self._pc)
+        return "CPU {core}(PC={pc})".format(core=self._core, pc=self._pc)
 
 ## emulates an Input/output device of the Hardware
+##  replica: number of the device when there are several identical ones (its deviceId is Type-replica)
 class AbstractIODevice():
 
-    def __init__(self, deviceId, deviceTime):
-        self._deviceId = deviceId
+    def __init__(self, deviceType, deviceTime, replica = None):
+        self._deviceType = deviceType
+        if replica is None:
+            self._deviceId = deviceType
+        else:
+            self._deviceId = "{type}-{replica}".format(type = deviceType, replica = replica)
         self._deviceTime = deviceTime
         self._busy = False
+        ## async hardware mode: each operation runs as a coroutine instead of counting clock ticks
+        self._asyncMode = False
+        self._task = None
 
     @property
     def deviceId(self):
         return self._deviceId
 
+    @property
+    def deviceType(self):
+        return self._deviceType
+
+    @property
+    def deviceTime(self):
+        return self._deviceTime
+
     @property
     def is_busy(self):
         return self._busy
@@ -268,6 +923,23 @@ class AbstractIODevice():
     def is_idle(self):
         return not self._busy
 
+    @property
+    def asyncMode(self):
+        return self._asyncMode
+
+    @asyncMode.setter
+    def asyncMode(self, asyncMode):
+        self._asyncMode = asyncMode
+
+    ## True if the operations move data through the DMA (the controller programs the transfer)
+    @property
+    def dma(self):
+        return False
+
+    ## releases what the device keeps open (files), on switchOff
+    def close(self):
+        pass
+
     ## executes an I/O instruction
     def execute(self, operation):
         if (self._busy):
@@ -276,6 +948,23 @@ class AbstractIODevice():
             self._busy = True
             self._ticksCount = 0
             self._operation = operation
+            if self._asyncMode:
+                self._task = asyncio.get_running_loop().create_task(self._runAsync(operation))
+
+    ## async mode: the operation runs and its IO_OUT is posted, the cpu handles it at its next instruction boundary
+    ##  (the device stays busy until the IO_OUT is taken, the controller can't send it another operation before)
+    async def _runAsync(self, operation):
+        await self.serve(operation)
+        self._task = None
+        HARDWARE.interruptVector.post(IRQ(IO_OUT_INTERRUPTION_TYPE, self._deviceId), self._release)
+
+    def _release(self):
+        self._busy = False
+
+    ## async mode: what the operation does, by default it takes deviceTime ticks (like in tick())
+    ##  the devices that finish in the same tick do it in the order of the hardware (like the clock subscribers)
+    async def serve(self, operation):
+        await HARDWARE.clock.waitTicks(self._deviceTime + 1, list(HARDWARE.ioDevices).index(self._deviceId))
 
     def tick(self, tickNbr):
         if (self._busy):
@@ -288,10 +977,324 @@ class AbstractIODevice():
             else:
                 log.logger.info("device {deviceId} - Busy: {ticksCount} of {deviceTime}".format(deviceId = self.deviceId, ticksCount = self._ticksCount, deviceTime = self._deviceTime))
 
+    ## event-driven clock: the operation finishes when _ticksCount gets higher than _deviceTime
+    def nextEventTick(self, tickNbr):
+        if (self._busy):
+            return tickNbr + self._deviceTime - self._ticksCount
+        return None
+
+    def skipTicks(self, ticks):
+        if (self._busy):
+            self._ticksCount += ticks
+
 
 class PrinterIODevice(AbstractIODevice):
-    def __init__(self):
-        super(PrinterIODevice, self).__init__("Printer", 3)
+    def __init__(self, replica = None):
+        super(PrinterIODevice, self).__init__("Printer", 3, replica)
+
+
+## emulates a disk: the service time is the seek from the head position to the cylinder plus the transfer
+##  seekTime: ticks per cylinder the head moves
+##  the operations that don't name a cylinder access a random one (seeded, so runs can be repeated)
+class DiskIODevice(AbstractIODevice):
+    def __init__(self, replica = None, cylinders = 200, seekTime = 0.05, transferTime = 2, seed = 0):
+        super(DiskIODevice, self).__init__("Disk", transferTime, replica)
+        self._cylinders = cylinders
+        self._seekTime = seekTime
+        self._transferTime = transferTime
+        self._head = 0
+        self._random = random.Random(seed)
+
+    @property
+    def cylinders(self):
+        return self._cylinders
+
+    @property
+    def head(self):
+        return self._head
+
+    ## the cylinder the operation accesses (the controller asks for it when the request arrives)
+    def cylinderOf(self, operation):
+        cylinder = ASM.cylinder(operation)
+        if cylinder is None:
+            return self._random.randrange(self._cylinders)
+        if not (0 <= cylinder < self._cylinders):
+            raise Exception("Cylinder {cylinder} out of {id} (0..{last})".format(cylinder = cylinder, id = self.deviceId, last = self._cylinders - 1))
+        return cylinder
+
+    ## via: a cylinder the head goes through before (ie: the end of the disk, when it turns around)
+    def serviceTime(self, cylinder, via = None):
+        distance = abs(cylinder - self._head)
+        if via is not None:
+            distance = abs(via - self._head) + abs(cylinder - via)
+        return self._transferTime + math.ceil(distance * self._seekTime)
+
+    ## cylinder: the one the controller resolved for the operation
+    def execute(self, operation, cylinder = None, via = None):
+        if cylinder is None:
+            cylinder = self.cylinderOf(operation)
+        super(DiskIODevice, self).execute(operation)
+        self._deviceTime = self.serviceTime(cylinder, via)
+        self._head = cylinder
+
+
+class NetworkIODevice(AbstractIODevice):
+    def __init__(self, replica = None):
+        super(NetworkIODevice, self).__init__("Network", 4, replica)
+
+
+## emulates a device backed by a local file: each operation writes a block (the operation, padded) at the end of the file
+##  in async mode the write runs in a worker thread, with its real latency, while the cpu keeps running
+class FileIODevice(AbstractIODevice):
+    def __init__(self, path, blockSize = 512, deviceType = "File", replica = None):
+        super(FileIODevice, self).__init__(deviceType, 1, replica)
+        self._path = path
+        self._blockSize = blockSize
+        self._file = open(path, 'ab')
+        self._blocksWritten = 0
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def blocksWritten(self):
+        return self._blocksWritten
+
+    def execute(self, operation):
+        super(FileIODevice, self).execute(operation)
+        ## in sync mode the write blocks the tick loop
+        if not self._asyncMode:
+            self._write(operation)
+
+    async def serve(self, operation):
+        await asyncio.get_running_loop().run_in_executor(None, self._write, operation)
+
+    def _write(self, operation):
+        self._file.write(operation.encode()[:self._blockSize].ljust(self._blockSize, b'\0'))
+        self._file.flush()
+        self._blocksWritten += 1
+
+    def close(self):
+        self._file.close()
+
+
+## emulates a block device with a buffer backed by a local file (memory-mapped): the device does no work by itself,
+##  the DMA moves the data between the memory and the buffer, and the device is busy until the transfer finishes
+##  the operations can name the block they start at: 'IO:Block@3' (block 0 by default)
+##  an existing file keeps its data (it is only extended to the size of the device)
+class BlockIODevice(AbstractIODevice):
+    def __init__(self, path, blocks = 64, blockSize = 32, deviceType = "Block", replica = None):
+        super(BlockIODevice, self).__init__(deviceType, 0, replica)
+        self._path = path
+        self._blocks = blocks
+        self._blockSize = blockSize
+        self._file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        if os.path.getsize(path) < blocks * blockSize:
+            self._file.truncate(blocks * blockSize)
+        self._buffer = mmap.mmap(self._file.fileno(), blocks * blockSize)
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def size(self):
+        return self._blocks * self._blockSize
+
+    @property
+    def dma(self):
+        return True
+
+    ## the offset in the buffer of the block the operation starts at
+    def offsetOf(self, operation):
+        block = ASM.cylinder(operation)
+        if block is None:
+            block = 0
+        if not (0 <= block < self._blocks):
+            raise Exception("Block {block} out of {id} (0..{last})".format(block = block, id = self.deviceId, last = self._blocks - 1))
+        return block * self._blockSize
+
+    def read(self, offset, count):
+        return self._buffer[offset:offset + count]
+
+    def write(self, offset, data):
+        self._buffer[offset:offset + len(data)] = data
+
+    ## the DMA takes the operation, it only has to be busy (in async mode too)
+    def execute(self, operation):
+        if (self._busy):
+            raise Exception("Device {id} is busy, can't  execute operation: {op}".format(id = self.deviceId, op = operation))
+        self._busy = True
+        self._operation = operation
+
+    ## the DMA finished the transfer of the operation
+    def finish(self):
+        self._busy = False
+
+    def tick(self, tickNbr):
+        pass
+
+    def nextEventTick(self, tickNbr):
+        return None
+
+    def skipTicks(self, ticks):
+        pass
+
+    def flush(self):
+        self._buffer.flush()
+
+    def close(self):
+        self._buffer.flush()
+        self._buffer.close()
+        self._file.close()
+
+
+## emulates a DMA transfer: count cells between the memory (a list of physical segments [(address, count)])
+##  and the buffer of a device, from the given offset
+##  toMemory: True reads the buffer into the memory, False writes the memory into the buffer
+class DmaTransfer():
+
+    def __init__(self, device, offset, segments, toMemory):
+        self._device = device
+        self._offset = offset
+        self._segments = segments
+        self._toMemory = toMemory
+        self._count = sum(count for address, count in segments)
+        self._moved = 0
+        ## position in the segments of the next cell to move
+        self._segment = 0
+        self._segmentMoved = 0
+
+    @property
+    def device(self):
+        return self._device
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def moved(self):
+        return self._moved
+
+    @property
+    def pending(self):
+        return self._count - self._moved
+
+    @property
+    def toMemory(self):
+        return self._toMemory
+
+    ## the next chunk to move (up to cells cells, inside a segment): returns (address, offset, size) and advances past it
+    def nextChunk(self, cells):
+        address, count = self._segments[self._segment]
+        size = min(cells, count - self._segmentMoved)
+        chunk = (address + self._segmentMoved, self._offset + self._moved, size)
+        self._moved += size
+        self._segmentMoved += size
+        if self._segmentMoved == count:
+            self._segment += 1
+            self._segmentMoved = 0
+        return chunk
+
+    def __repr__(self):
+        direction = "to memory" if self._toMemory else "from memory"
+        return "DmaTransfer({id} {direction}: {moved} of {count})".format(id = self._device.deviceId, direction = direction, moved = self._moved, count = self._count)
+
+
+## emulates a DMA controller: moves the data of the transfers between the memory and the device buffers
+##  without the cpu, bandwidth cells per tick (one transfer at a time, the others wait in order)
+##  and raises #DMA when a transfer finishes
+##  asyncMode: the #DMA is posted (the cpu takes it at its next instruction boundary, like the IO_OUT of the async devices)
+class DmaController():
+
+    def __init__(self, memory, interruptVector, bandwidth = 16, asyncMode = False):
+        self._memory = memory
+        self._interruptVector = interruptVector
+        self._bandwidth = bandwidth
+        self._asyncMode = asyncMode
+        self._transfers = deque()
+        self._current = None
+        self._cellsMoved = 0
+        self._transfersDone = 0
+
+    @property
+    def bandwidth(self):
+        return self._bandwidth
+
+    @property
+    def cellsMoved(self):
+        return self._cellsMoved
+
+    @property
+    def transfersDone(self):
+        return self._transfersDone
+
+    @property
+    def is_idle(self):
+        return self._current is None
+
+    ## programs a transfer for the operation of the device (the device is busy until it finishes)
+    def transfer(self, device, operation, segments, toMemory = False):
+        offset = device.offsetOf(operation)
+        transfer = DmaTransfer(device, offset, segments, toMemory)
+        if offset + transfer.count > device.size:
+            raise Exception("Transfer of {count} cells at offset {offset} overflows {id} (size: {size})".format(count = transfer.count, offset = offset, id = device.deviceId, size = device.size))
+        device.execute(operation)
+        if self._current is None:
+            self._current = transfer
+        else:
+            self._transfers.append(transfer)
+        return transfer
+
+    def tick(self, tickNbr):
+        if self._current is not None:
+            self._move(self._bandwidth)
+            log.logger.info("dma - {transfer}".format(transfer = self._current))
+            if self._current.pending == 0:
+                self._finish()
+
+    ## event-driven clock: the transfer finishes on the tick that moves its last cells (a transfer takes at least 1 tick)
+    def nextEventTick(self, tickNbr):
+        if self._current is None:
+            return None
+        return tickNbr + max(1, math.ceil(self._current.pending / self._bandwidth)) - 1
+
+    def skipTicks(self, ticks):
+        if self._current is not None:
+            self._move(ticks * self._bandwidth)
+
+    ## moves up to cells cells of the current transfer, a slice copy per segment
+    def _move(self, cells):
+        transfer = self._current
+        device = transfer.device
+        while (cells > 0) and (transfer.pending > 0):
+            address, offset, size = transfer.nextChunk(cells)
+            if transfer.toMemory:
+                data = device.read(offset, size)
+                if not self._memory.compact:
+                    data = ASM.decode(data)
+                self._memory.writeBlock(address, data)
+            else:
+                data = self._memory.readBlock(address, size)
+                if not self._memory.compact:
+                    data = ASM.encode(data)
+                device.write(offset, data)
+            cells -= size
+            self._cellsMoved += size
+
+    def _finish(self):
+        transfer = self._current
+        self._transfersDone += 1
+        self._current = self._transfers.popleft() if self._transfers else None
+        dmaIRQ = IRQ(DMA_INTERRUPTION_TYPE, transfer)
+        if self._asyncMode:
+            ## the device stays busy until the #DMA is taken
+            self._interruptVector.post(dmaIRQ, transfer.device.finish)
+        else:
+            transfer.device.finish()
+            self._interruptVector.handle(dmaIRQ)
 
 
 class Timer:
@@ -304,9 +1307,11 @@ class Timer:
         self._quantum = 0   # por default esta desactivado
 
     def tick(self, tickNbr):
+        ## instruction boundary: the cpu takes the interruptions posted by asynchronous devices
+        self._interruptVector.drain()
         if self._active and (self._tickCount >= self._quantum) and self._cpu.isBusy():
             # se “cumplio” el limite de ejecuciones
-            timeoutIRQ = IRQ(TIMEOUT_INTERRUPTION_TYPE)
+            timeoutIRQ = IRQ(TIMEOUT_INTERRUPTION_TYPE, None, self._cpu.core)
             self._interruptVector.handle(timeoutIRQ)
 
         # registro que el proceso en CPU corrio un ciclo mas
@@ -316,7 +1321,23 @@ class Timer:
     def reset(self):
            self._tickCount = 0
 
+    ## event-driven clock: the timeout can only happen while the cpu is busy
+    def nextEventTick(self, tickNbr):
+        nextTick = self._cpu.nextEventTick(tickNbr)
+        if self._active and (nextTick is not None):
+            timeoutTick = tickNbr + max(0, self._quantum - self._tickCount)
+            nextTick = min(nextTick, timeoutTick)
+        return nextTick
+
+    def skipTicks(self, ticks):
+        self._tickCount += ticks
+        self._cpu.skipTicks(ticks)
+
     
+    @property
+    def tickCount(self):
+        return self._tickCount
+
     @property
     def quantum(self):
         return self._quantum
@@ -327,34 +1348,149 @@ class Timer:
         self._quantum = quantum
 
 
+## emulates the swap area of a local disk: a file split in slots of slotSize cells
+##  (1 byte opcode per cell, like the compact memory)
+##  the swap only lives while the hardware is on: an existing file is truncated (its content is lost)
+class SwapDevice():
+
+    def __init__(self, path, slotSize):
+        self._path = path
+        self._slotSize = slotSize
+        self._file = open(path, 'w+b')
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def slotSize(self):
+        return self._slotSize
+
+    def write(self, slot, data):
+        self._file.seek(slot * self._slotSize)
+        self._file.write(bytes(data[:self._slotSize]).ljust(self._slotSize, b'\0'))
+
+    def read(self, slot):
+        self._file.seek(slot * self._slotSize)
+        return self._file.read(self._slotSize)
+
+    def close(self):
+        self._file.close()
+
+
 ## emulates the Hardware that were the Operative System run
 class Hardware():
 
     ## Setup our hardware
-    def setup(self, memorySize):
+    ##  virtualTime = True: the clock does not wait between ticks (for regression workloads)
+    ##  eventDriven = True: the clock skips the ticks where nothing happens
+    ##  compactMemory = True: the memory stores 1 byte opcodes instead of instructions
+    ##  backingFile: path of a file to map the (compact) memory on
+    ##  frameSize: size of the memory frames, the MMU works in paged mode
+    ##  tlbSize: entries of the TLB in front of the paged MMU (tlbPolicy: TLB_LRU / TLB_FIFO, tlbTagged: tagged by pid or flushed)
+    ##  swapFile: path of the swap area (one slot per page) for the paged MMU
+    ##  cores: amount of cpu cores, each one with its own MMU (and TLB) and Timer
+    ##  ioDevices: the I/O devices (default: printer, disk and network), each one is addressed by its deviceId
+    ##  ioReplicas: amount of identical default devices of each type (ie: {"Printer": 3} builds Printer-1..Printer-3)
+    ##  asyncMode = True: the clock is an asyncio task and the devices are coroutines (run it with runAsync)
+    ##  dmaBandwidth: cells the DMA controller moves per tick
+    def setup(self, memorySize, virtualTime = False, eventDriven = False, compactMemory = False, backingFile = None, frameSize = None,
+              tlbSize = None, tlbPolicy = TLB_LRU, tlbTagged = True, swapFile = None, cores = 1, ioDevices = None, ioReplicas = None,
+              asyncMode = False, dmaBandwidth = 16):
+        if asyncMode and eventDriven:
+            raise Exception("The async mode can't skip ticks, use eventDriven = False")
         ## add the components to the "motherboard"
-        self._memory = Memory(memorySize)
+        if backingFile is not None:
+            self._memory = MappedMemory(memorySize, backingFile)
+        elif compactMemory:
+            self._memory = CompactMemory(memorySize)
+        else:
+            self._memory = Memory(memorySize)
         self._interruptVector = InterruptVector()
-        self._clock = Clock()
-        self._ioDevice = PrinterIODevice()
-        self._mmu = MMU(self._memory)
-        self._cpu = Cpu(self._mmu, self._interruptVector)
-        self._timer = Timer(self._cpu, self._interruptVector)
-        self._clock.addSubscriber(self._ioDevice)
-        self._clock.addSubscriber(self._timer)
+        if asyncMode:
+            self._clock = AsyncClock(virtualTime)
+        else:
+            self._clock = Clock(virtualTime, eventDriven)
+        self._asyncMode = asyncMode
+        if ioDevices is None:
+            ioDevices = []
+            for deviceClass in [PrinterIODevice, DiskIODevice, NetworkIODevice]:
+                replicas = (ioReplicas or {}).get(deviceClass().deviceType, 1)
+                if replicas == 1:
+                    ioDevices.append(deviceClass())
+                else:
+                    ioDevices.extend([deviceClass(replica) for replica in range(1, replicas + 1)])
+        ## device registry: deviceId -> device, and deviceType -> its replicas
+        self._ioDevices = OrderedDict()
+        self._ioDevicesByType = OrderedDict()
+        for device in ioDevices:
+            if device.deviceId in self._ioDevices:
+                raise Exception("Duplicated I/O device {id}".format(id = device.deviceId))
+            self._ioDevices[device.deviceId] = device
+            self._ioDevicesByType.setdefault(device.deviceType, []).append(device)
+            ## the asynchronous devices don't need the ticks, they wait on the clock
+            device.asyncMode = asyncMode
+            if not asyncMode:
+                self._clock.addSubscriber(device)
+        ## the default device is the one plain IO instructions go to
+        self._ioDevice = self._ioDevicesByType.get(DEFAULT_IO_DEVICE, ioDevices)[0]
+        ## the DMA is ticked in both modes, its transfers finish at a tick boundary
+        self._dma = DmaController(self._memory, self._interruptVector, dmaBandwidth, asyncMode)
+        self._clock.addSubscriber(self._dma)
+        self._cpus = []
+        self._timers = []
+        for core in range(0, cores):
+            tlb = None
+            if (frameSize is not None) and (tlbSize is not None):
+                tlb = TLB(tlbSize, tlbPolicy, tlbTagged)
+            mmu = MMU(self._memory, frameSize, tlb, self._interruptVector, core)
+            cpu = Cpu(mmu, self._interruptVector, core)
+            timer = Timer(cpu, self._interruptVector)
+            self._cpus.append(cpu)
+            self._timers.append(timer)
+            self._clock.addSubscriber(timer)
+        ## the first core is "the" cpu
+        self._cpu = self._cpus[0]
+        self._mmu = self._cpu.mmu
+        self._timer = self._timers[0]
+        self._swap = None
+        if (frameSize is not None) and (swapFile is not None):
+            self._swap = SwapDevice(swapFile, frameSize)
 
     def switchOn(self):
         log.logger.info(" ---- SWITCH ON ---- ")
         return self.clock.start()
 
+    ## async mode: runs the given amount of ticks on an asyncio event loop
+    def runAsync(self, times):
+        if not self._asyncMode:
+            raise Exception("The hardware is not in async mode")
+        asyncio.run(self._clock.run(times))
+
+    ## the clock finishes its last tick before the files (memory, swap and devices) are closed
     def switchOff(self):
         self.clock.stop()
+        self.clock.join()
+        self.memory.flush()
+        self.memory.close()
+        if self._swap is not None:
+            self._swap.close()
+        for device in self._ioDevices.values():
+            device.close()
         log.logger.info(" ---- SWITCH OFF ---- ")
 
     @property
     def cpu(self):
         return self._cpu
 
+    @property
+    def cpus(self):
+        return self._cpus
+
+    @property
+    def timers(self):
+        return self._timers
+
     @property
     def clock(self):
         return self._clock
@@ -375,12 +1511,33 @@ class Hardware():
     def ioDevice(self):
         return self._ioDevice
 
+    @property
+    def ioDevices(self):
+        return self._ioDevices
+
+    @property
+    def ioDevicesByType(self):
+        return self._ioDevicesByType
+
+    def device(self, deviceId):
+        if deviceId not in self._ioDevices:
+            raise Exception("There is no I/O device {id}".format(id = deviceId))
+        return self._ioDevices[deviceId]
+
+    @property
+    def swap(self):
+        return self._swap
+
+    @property
+    def dma(self):
+        return self._dma
+
     @property
     def timer(self):
         return self._timer
 
     def __repr__(self):
-        return "HARDWARE state {cpu}\n{mem}".format(cpu=self._cpu, mem=self._memory)
+        return "HARDWARE state {cpus}\n{mem}".format(cpus=self._cpus, mem=self._memory)
 
 ### HARDWARE is a global variable
 ### can be access from any
@@ -11,6 +11,7 @@ if __name__ == '__main__':
     log.logger.info('Starting emulator')
 
     ## setup our hardware and set memory size to 25 "cells"
+    ## (con HARDWARE.setup(25, virtualTime=True) el clock no espera 1 segundo entre ticks)
     HARDWARE.setup(25)
 
     ## Switch on computer
@@ -1,6 +1,11 @@
 #!/usr/bin/env python
 
 from hardware import *
+from collections import OrderedDict, deque
+import bisect
+import heapq
+import math
+import random
 import log
 
 
@@ -11,6 +16,8 @@ class Program():
     def __init__(self, name, instructions):
         self._name = name
         self._instructions = self.expand(instructions)
+        self._opcodes = None
+        self._bursts = None
 
     @property
     def name(self):
@@ -20,8 +27,28 @@ class Program():
     def instructions(self):
         return self._instructions
 
+    ## el programa codificado a opcodes (se codifica una sola vez)
+    @property
+    def opcodes(self):
+        if self._opcodes is None:
+            self._opcodes = ASM.encode(self._instructions)
+        return self._opcodes
+
+    ## cantidad de instrucciones de CPU seguidas desde pc (la rafaga hasta el proximo IO o EXIT)
+    def cpuBurstFrom(self, pc):
+        if self._bursts is None:
+            #se calcula una sola vez, desde el final: bursts[i] = rafaga que empieza en i
+            bursts = [0] * (len(self._instructions) + 1)
+            for i in range(len(self._instructions) - 1, -1, -1):
+                if self._instructions[i] == INSTRUCTION_CPU:
+                    bursts[i] = bursts[i + 1] + 1
+            self._bursts = bursts
+        return self._bursts[pc]
+
     def addInstr(self, instruction):
         self._instructions.append(instruction)
+        self._opcodes = None
+        self._bursts = None
 
     def expand(self, instructions):
         expanded = []
@@ -45,41 +72,193 @@ class Program():
         return "Program({name}, {instructions})".format(name=self._name, instructions=self._instructions)
 
 
+## request orderings of the IoDeviceController
+##  FCFS: arrival order
+##  SSTF: the request closest to the head (shortest seek time first)
+##  SCAN: the head sweeps up to the last cylinder and then down to the first one (elevator)
+##  C_LOOK: the head only serves going up, and jumps back to the lowest request
+##  (the disk orderings need a device with a head, like DiskIODevice)
+FCFS = "fcfs"
+SSTF = "sstf"
+SCAN = "scan"
+C_LOOK = "c-look"
+
 ## emulates an Input/Output device controller (driver)
+##  loader: for the devices that move data by DMA, the one that knows (and pins) the memory of the processes
 class IoDeviceController():
 
-    def __init__(self, device):
+    def __init__(self, device, policy = FCFS, loader = None):
+        if (policy != FCFS) and not hasattr(device, 'head'):
+            raise Exception("Policy {policy} needs a device with a head, {id} has none".format(policy = policy, id = device.deviceId))
+        if device.dma and (loader is None):
+            raise Exception("Device {id} moves data by DMA, its controller needs a loader".format(id = device.deviceId))
         self._device = device
-        self._waiting_queue = []
+        self._policy = policy
+        self._loader = loader
+        ## FCFS: a deque in arrival order, disk orderings: a list of (cylinder, seq, request) sorted by cylinder
+        if policy == FCFS:
+            self._waiting_queue = deque()
+        else:
+            self._waiting_queue = []
+        self._seq = 0
+        ## SCAN: deviceId -> the head of that device is going up (1, the default) or down (-1)
+        self._directions = {}
         self._currentPCB = None
+        self._currentRequest = None
+        ## queue latency stats: ticks each request waited before reaching the device
+        self._requests = 0
+        self._totalWait = 0
+        self._maxWait = 0
+        ## ticks from each request until its operation finished
+        self._latencies = []
+
+    @property
+    def policy(self):
+        return self._policy
 
     def runOperation(self, pcb, instruction):
-        pair = {'pcb': pcb, 'instruction': instruction}
-        # append: adds the element at the end of the queue
-        self._waiting_queue.append(pair)
+        pair = {'pcb': pcb, 'instruction': instruction, 'tick': HARDWARE.clock.currentTick, 'cylinder': None}
+        ## the cylinder is resolved on arrival, so every ordering serves the same requests
+        if hasattr(self._device, 'cylinderOf'):
+            pair['cylinder'] = self._device.cylinderOf(instruction)
+        if self._policy == FCFS:
+            # append: adds the element at the end of the queue
+            self._waiting_queue.append(pair)
+        else:
+            bisect.insort(self._waiting_queue, (pair['cylinder'], self._seq, pair))
+            self._seq += 1
         # try to send the instruction to hardware's device (if is idle)
-        self.__load_from_waiting_queue_if_apply()
+        self._load_from_waiting_queue_if_apply()
 
-    def getFinishedPCB(self):
+    ## deviceId: the device that finished (a controller with a single device ignores it)
+    def getFinishedPCB(self, deviceId = None):
         finishedPCB = self._currentPCB
+        self._recordLatency(self._currentRequest)
         self._currentPCB = None
-        self.__load_from_waiting_queue_if_apply()
+        self._currentRequest = None
+        self._load_from_waiting_queue_if_apply()
         return finishedPCB
 
-    def __load_from_waiting_queue_if_apply(self):
+    def _load_from_waiting_queue_if_apply(self):
         if (len(self._waiting_queue) > 0) and self._device.is_idle:
-            ## pop(): extracts (deletes and return) the first element in queue
-            pair = self._waiting_queue.pop(0)
-            #print(pair)
+            pair, via = self._popNext(self._device)
+            self._currentPCB = pair['pcb']
+            self._currentRequest = pair
+            self._dispatch(self._device, pair, via)
+
+    ## extracts the next request for the given device, and the cylinder the head goes through before (SCAN reaching an end)
+    def _popNext(self, device):
+        queue = self._waiting_queue
+        if self._policy == FCFS:
+            ## popleft(): extracts (deletes and return) the first element in queue in constant time
+            return queue.popleft(), None
+        head = device.head
+        ## first request at or above the head
+        up = bisect.bisect_left(queue, (head, -1))
+        via = None
+        if self._policy == SSTF:
+            index = up
+            if (up == len(queue)) or ((up > 0) and (head - queue[up - 1][0] < queue[up][0] - head)):
+                index = up - 1
+        elif self._policy == SCAN:
+            ## every device sweeps on its own (the replicas of a pool have their own heads)
+            if self._directions.get(device.deviceId, 1) == 1:
+                index = up
+                if up == len(queue):
+                    ## nothing above: the head goes to the last cylinder and turns around
+                    self._directions[device.deviceId] = -1
+                    via = device.cylinders - 1
+                    index = len(queue) - 1
+            else:
+                index = bisect.bisect_right(queue, (head, self._seq)) - 1
+                if index < 0:
+                    ## nothing below: the head goes to the first cylinder and turns around
+                    self._directions[device.deviceId] = 1
+                    via = 0
+                    index = 0
+        else:
+            ## C_LOOK: nothing above, the head jumps back to the lowest request
+            index = up if up < len(queue) else 0
+        cylinder, seq, pair = queue.pop(index)
+        return pair, via
+
+    def _dispatch(self, device, pair, via):
+        self._recordWait(pair)
+        if device.dma:
+            ## the DMA writes the memory of the process to the device, the process can't lose its pages until #DMA
             pcb = pair['pcb']
-            instruction = pair['instruction']
-            self._currentPCB = pcb
-            self._device.execute(instruction)
+            self._loader.pin(pcb)
+            HARDWARE.dma.transfer(device, pair['instruction'], self._loader.segments(pcb))
+        elif pair['cylinder'] is None:
+            device.execute(pair['instruction'])
+        else:
+            device.execute(pair['instruction'], pair['cylinder'], via)
+
+    def _recordWait(self, pair):
+        wait = HARDWARE.clock.currentTick - pair['tick']
+        self._requests += 1
+        self._totalWait += wait
+        self._maxWait = max(self._maxWait, wait)
 
+    def _recordLatency(self, pair):
+        if pair is not None:
+            self._latencies.append(HARDWARE.clock.currentTick - pair['tick'])
+
+    @property
+    def devices(self):
+        return [self._device]
+
+    def stats(self):
+        averageWait = 0
+        if self._requests > 0:
+            averageWait = self._totalWait / self._requests
+        averageLatency = 0
+        p99Latency = 0
+        if self._latencies:
+            latencies = sorted(self._latencies)
+            averageLatency = sum(latencies) / len(latencies)
+            p99Latency = latencies[math.ceil(0.99 * len(latencies)) - 1]
+        return {'devices': len(self.devices), 'policy': self._policy, 'requests': self._requests, 'averageWait': averageWait, 'maxWait': self._maxWait,
+                'waiting': len(self._waiting_queue), 'completed': len(self._latencies), 'averageLatency': averageLatency, 'p99Latency': p99Latency}
 
     def __repr__(self):
         return "IoDeviceController for {deviceID} running: {currentPCB} waiting: {waiting_queue}".format(deviceID=self._device.deviceId, currentPCB=self._currentPCB, waiting_queue=self._waiting_queue)
 
+
+## emulates a controller (driver) for N identical devices: a waiting request goes to any idle device
+class PooledIoDeviceController(IoDeviceController):
+
+    def __init__(self, devices, policy = FCFS, loader = None):
+        super(PooledIoDeviceController, self).__init__(devices[0], policy, loader)
+        self._devices = devices
+        ## deviceId -> request being served by that device
+        self._currentRequests = {}
+
+    def getFinishedPCB(self, deviceId = None):
+        if deviceId not in self._currentRequests:
+            raise Exception("Device {id} has no operation running in {controller}".format(id = deviceId, controller = self))
+        pair = self._currentRequests.pop(deviceId)
+        self._recordLatency(pair)
+        self._load_from_waiting_queue_if_apply()
+        return pair['pcb']
+
+    def _load_from_waiting_queue_if_apply(self):
+        for device in self._devices:
+            if len(self._waiting_queue) == 0:
+                return
+            if device.is_idle:
+                pair, via = self._popNext(device)
+                self._currentRequests[device.deviceId] = pair
+                self._dispatch(device, pair, via)
+
+    @property
+    def devices(self):
+        return self._devices
+
+    def __repr__(self):
+        currentPCBs = {deviceId: pair['pcb'] for deviceId, pair in self._currentRequests.items()}
+        return "PooledIoDeviceController for {deviceIDs} running: {currentPCBs} waiting: {waiting_queue}".format(deviceIDs=[device.deviceId for device in self._devices], currentPCBs=currentPCBs, waiting_queue=self._waiting_queue)
+
 ## emulates the  Interruptions Handlers
 class AbstractInterruptionHandler():
     def __init__(self, kernel):
@@ -93,71 +272,100 @@ class AbstractInterruptionHandler():
         log.logger.error("-- EXECUTE MUST BE OVERRIDEN in class {classname}".format(classname=self.__class__.__name__))
 
     #tp 4
-    def expropiate(self, pcbRunning, pcb):
-        self.kernel.dispatcher.save(pcbRunning) #sacamos del cpu con dipatcher
+    def expropiate(self, pcbRunning, pcb, core = 0):
+        self.kernel.dispatcher.save(pcbRunning, core) #sacamos del cpu con dipatcher
         pcbRunning.setState("ready") #cambiamos estado
         self.kernel.scheduler.add(pcbRunning) #agregamos al scheduler
-        self.kernel.pcbTable.setRunningPcb(pcb) #seteamos en pcb table el pcb nuevo en running
+        self.kernel.pcbTable.setRunningPcb(pcb, core) #seteamos en pcb table el pcb nuevo en running
         pcb.setState("running")#cambio de estado
-        self.kernel.dispatcher.load(pcb) #se carga
+        self.kernel.dispatcher.load(pcb, core) #se carga
+
+    #un pcb quedo listo para correr (nuevo o volvio de I/O): si hay un core libre se carga ahi,
+    #si no se pregunta si hay que expropiar a alguno de los que estan corriendo, y si no va a la ready queue
+    def runOrAddToReady(self, pcb):
+        core = self.kernel.pcbTable.idleCore(pcb.getAffinity())
+        if core is not None:
+            pcb.setState(RUNNING)
+            self.kernel.pcbTable.setRunningPcb(pcb, core)
+            self.kernel.dispatcher.load(pcb, core)
+            return
+        #cada vez que haya que agregar a la ready queue hay que preguntar si hay que expropiar (diapos)
+        for core, pcbRunning in enumerate(self.kernel.pcbTable.getRunningPCBs()):
+            if pcb.canRunOn(core) and self.kernel.scheduler.mustExpropiate(pcbRunning, pcb):
+                self.expropiate(pcbRunning, pcb, core)
+                return
+        pcb.setState(READY)
+        self.kernel.scheduler.add(pcb)
+
+    #el core quedo libre: se carga el proximo de la ready queue (si hay)
+    def runNextInQueue(self, core):
+        if (not self.kernel.scheduler.isEmptyFor(core)):
+            nextInQueue = self.kernel.scheduler.nextInQueueFor(core)
+            newPCB = nextInQueue['pcb']
+            newPCB.setState(RUNNING)
+            self.kernel.pcbTable.setRunningPcb(newPCB, core)
+            self.kernel.dispatcher.load(newPCB, core)
      
 
 #tp 4
 class TimeoutInterruptionHandler(AbstractInterruptionHandler):
     #interrupcion de cuando se le termina el tiempo al proceso
     def execute(self, irq):
+        #guardo en una variable lo que esta corriendo (en el core que genero la interrupcion)
+        pcbRunning = self.kernel.pcbTable.getRunningPCB(irq.core)
+        #el proceso uso todo su quantum (el MLFQ lo baja de nivel)
+        self.kernel.scheduler.quantumExpired(pcbRunning)
         #si no es vacio la ready queue del scheduler entonces (si no esta vacia es porque algo esta corriendo)
-        if not (self.kernel.scheduler.isEmpty()):
-            #guardo en una variable lo que esta corriendo
-            pcbRunning = self.kernel.pcbTable.getRunningPCB()
-            #traigo el que sigue de la lista
-            newPcb = self.kernel.scheduler.nextInQueue()
-            #lo expropio, osea saco el que corria por el que sigue
-            self.expropiate(pcbRunning, newPcb['pcb'])
+        if not (self.kernel.scheduler.isEmptyFor(irq.core)):
+            #lo expropio: vuelve a la ready queue y se carga el que sigue (puede volver a ser el mismo si tiene mas prioridad)
+            self.kernel.dispatcher.save(pcbRunning, irq.core)
+            pcbRunning.setState(READY)
+            self.kernel.scheduler.add(pcbRunning)
+            self.kernel.pcbTable.setRunningPcb(None, irq.core)
+            self.runNextInQueue(irq.core)
+        elif self.kernel.scheduler.quantumFor(pcbRunning) is not None:
+            #sigue corriendo el mismo, con el quantum nuevo que le da el scheduler
+            self.kernel.dispatcher.renewQuantum(pcbRunning, irq.core)
 
         log.logger.info(self.kernel.pcbTable.__repr__())
 
 class StatInterruptionHandler(AbstractInterruptionHandler):
 
     def execute(self, irq):
+        #el clock por eventos puede saltear ticks, en ese caso llega la cantidad de ticks salteados
+        #(en un salto no pasa nada: se revisa el scheduler una vez y el gantt guarda el tramo entero)
+        ticks = irq.parameters or 1
         self.kernel.scheduler.checkTick()
         self.kernel.diagramDeGrant.activateGantt()
-        self.kernel.diagramDeGrant.doGantt()
+        self.kernel.diagramDeGrant.doGantt(ticks)
 
 class KillInterruptionHandler(AbstractInterruptionHandler):
 
     def execute(self, irq):
 
-         # obtengo el pcb del proceso que esta corriendo en cpu
-        pcbKill = self.kernel.pcbTable.getRunningPCB()
+         # obtengo el pcb del proceso que esta corriendo en el core que genero la interrupcion
+        core = irq.core
+        pcbKill = self.kernel.pcbTable.getRunningPCB(core)
 
         #salva el pc de cpu en el pcb de la variable pcbKill y pone el cpu en -1
-        self.kernel.dispatcher.save(pcbKill)
+        self.kernel.dispatcher.save(pcbKill, core)
         
         # pasar el estado a "terminated" con el pid del pcb dado 
         pcbKill.setState(TERMINATED)
+        self.kernel.scheduler.terminated(pcbKill)
+
+        #se libera la memoria que ocupaba el proceso
+        self.kernel.loader.free(pcbKill)
         
         # modificar el pc del pcb  
         #le pasamos el id pid del pcb que queremos modificar y el pc que queres que ponga
         #self.kernel.pcbTable.modificarPcPCB(pcbKill.getPid(), pcbKill.getPc()) 
 
         #Limpiar la setRunningPcb, para que quede libre y podamos poner otro programa
-        self.kernel.pcbTable.setRunningPcb(None)
+        self.kernel.pcbTable.setRunningPcb(None, core)
             
-         # verifico si la lista de la cola de ready no es vacia entonces:
-        if(not self.kernel.scheduler.isEmpty()):
-            
-
-            #creo una nueva variable con contenga un pcb nuevo
-            # Obtiene el proximo pcb() de nextInQueue() en la READYQUEUE siguiendo la metodologia FIFO
-            nextInQueue = self.kernel.scheduler.nextInQueue()
-            #cambia el estado del newPcb a running
-            newPCB = nextInQueue['pcb']
-            newPCB.setState(RUNNING)
-            #Carga pcb() de la variable newPCB en el CPU()
-            self.kernel.dispatcher.load(newPCB)
-            #cargamos en pcb table el pcb que esta "running" ahora en cpu
-            self.kernel.pcbTable.setRunningPcb(newPCB)
+        #si la ready queue no esta vacia se carga el proximo en el core
+        self.runNextInQueue(core)
 
     ## Imprim iprime el aviso de programa finalizado
     log.logger.info(" Program Finished ")
@@ -170,64 +378,59 @@ class IoInInterruptionHandler(AbstractInterruptionHandler):
 #la cpu lee una instruccion de I/O y genera una interrupcion, la recibe el interrup(??) vector y le avisa al so mediante el handler, al cual se le dan los atributos del pcb y queda a cargo el I/O
     def execute(self, irq):
         operation = irq.parameters
-        pcb = self.kernel.pcbTable.getRunningPCB() #obtengo el pcb de lo que esta corriendo ahora
-        self.kernel.dispatcher.save(pcb) #lo salvo
+        core = irq.core
+        pcb = self.kernel.pcbTable.getRunningPCB(core) #obtengo el pcb de lo que esta corriendo ahora en el core
+        self.kernel.dispatcher.save(pcb, core) #lo salvo
        
         #cambiar estado a waiting del pcb
         pcb.setState(WAITING)
+        #se bloqueo antes de terminar su quantum (el MLFQ lo sube de nivel)
+        self.kernel.scheduler.blockedOnIo(pcb)
         
         #modificar el estado del pcb en la pcb table con el pid de pcb
         #self.kernel.pcbTable.modificarStatePCB(pcb.getPid(), WAITING)
          #el manejo del pcb queda ahora manenajo por el io
-        self.kernel.ioDeviceController.runOperation(pcb, operation)
+        #el opcode no lleva el cilindro/bloque: la operacion completa se lee del programa (pc ya apunta a la siguiente)
+        program = pcb.getProgram()
+        if program is not None:
+            operation = program.instructions[pcb.getPc() - 1]
+        ioDeviceController = self.kernel.ioDeviceControllerFor(ASM.device(operation))
+        ioDeviceController.runOperation(pcb, operation)
+        #el cpu queda libre hasta que se cargue otro proceso
+        self.kernel.pcbTable.setRunningPcb(None, core)
         
-        #consultar si la lista de ready queue no es vacia, si no es vacia, agarramos el proximo programa y le cambiamos el estado bla bla
-        if (not self.kernel.scheduler.isEmpty()):
-            #newPcb = obtiene el proximo pcb de la ready queue 
-            nextInQueue = self.kernel.scheduler.nextInQueue()
-            #cambia el estado del newPcb a running
-            newPCB = nextInQueue['pcb']
-            newPCB.setState(RUNNING)
-             #modificamos el pc que ya estaba en la pcb tabla, por el nuevo pc
-            #self.kernel._PCBTABLE.modificarPcPCB(newPCB.getPid(), newPCB.getPC())
-            
-            #lo carga en la tabla como el proceso que esta corriendo
-            self.kernel.pcbTable.setRunningPcb(newPCB)
-             #lo carga a dispatcher con load
-            self.kernel.dispatcher.load(newPCB)
-          
+        #consultar si la lista de ready queue no es vacia, si no es vacia, agarramos el proximo programa y lo cargamos en el core
+        self.runNextInQueue(core)
            
         ## Imprime el estado del ioDeviceController()    
-        log.logger.info(self.kernel.ioDeviceController)
+        log.logger.info(ioDeviceController)
         
 
 class IoOutInterruptionHandler(AbstractInterruptionHandler):
 
     def execute(self, irq):
-        #obtiene un pcb del ioDevice cuando termina 
-        pcb = self.kernel.ioDeviceController.getFinishedPCB()
-        pcbRunning = self.kernel.pcbTable.getRunningPCB()
-        #si no hay nada corriendo en pcb table
-        if(pcbRunning == None):
-             #le cambia el estado al pcb y lo carga con dipatcher
-             pcb.setState(RUNNING)
-             self.kernel.dispatcher.load(pcb)
-             #le cambia el estado en la pcb table
-             #self.kernel.pcbTable.modificarStatePCB(pcb.getPid(), RUNNING)
-             # lo setea en running en la pcb table
-             self.kernel.pcbTable.setRunningPcb(pcb)
-        #cada vez que haya que agregar a la ready queue hay que preguntar si hay que expropiar (diapos)    
-        elif (self.kernel.scheduler.mustExpropiate(pcbRunning, pcb)):
-            self.expropiate(pcbRunning, pcb)
-        else:
-            pcb.setState(READY)
-            #self.kernel.pcbTable.modificarStatePCB(pcb.getPid(), READY)
-            self.kernel.scheduler.add(pcb)
-        #si no lo mismo pero en vez de running, ready
-        
+        #obtiene un pcb del ioDevice que termino (la interrupcion trae su deviceId)
+        deviceId = irq.parameters
+        ioDeviceController = self.kernel.ioDeviceControllerOf(deviceId)
+        pcb = ioDeviceController.getFinishedPCB(deviceId)
+        #si hay un core libre se carga, si no se expropia o va a la ready queue
+        self.runOrAddToReady(pcb)
         
-        #HARDWARE.cpu.pc = pcb['pc']
-        log.logger.info(self.kernel.ioDeviceController)
+        log.logger.info(ioDeviceController)
+
+class DmaInterruptionHandler(AbstractInterruptionHandler):
+
+    def execute(self, irq):
+        #el DMA termino de mover los datos del proceso: el dispositivo queda libre como con un IO_OUT
+        transfer = irq.parameters
+        deviceId = transfer.device.deviceId
+        ioDeviceController = self.kernel.ioDeviceControllerOf(deviceId)
+        pcb = ioDeviceController.getFinishedPCB(deviceId)
+        #sus paginas ya se pueden desalojar
+        self.kernel.loader.unpin(pcb)
+        self.runOrAddToReady(pcb)
+
+        log.logger.info("{transfer} finished, {controller}".format(transfer = transfer, controller = ioDeviceController))
 
 class NewInterruptionHandler(AbstractInterruptionHandler):
        
@@ -240,56 +443,471 @@ class NewInterruptionHandler(AbstractInterruptionHandler):
         pid            = self.kernel.pcbTable.getNewPID()
         pc             = 0
         pcb            = PCB(pid, 0, pc, NEW, priority)
-        baseDir        = self.kernel.loader.load_program(program)
-        pcb.setBaseDir(baseDir)
+        pcb.setProgram(program)
+        affinity = parameters.get('affinity')
+        if affinity is not None:
+            pcb.setAffinity(affinity)
+        #el deadline llega relativo a la llegada del proceso
+        deadline = parameters.get('deadline')
+        if deadline is not None:
+            pcb.setDeadline(HARDWARE.clock.currentTick + deadline)
+        shares = parameters.get('shares')
+        if shares is not None:
+            pcb.setShares(shares)
+        self.kernel.loader.load(pcb, program)
         pcb.setState(READY)
         
         #se agrega el pcb a la tabla de pcb table ya al finalizar todo
         self.kernel.pcbTable.add(pcb)
+        self.kernel.scheduler.created(pcb)
         
-        pcbRunning = self.kernel.pcbTable.getRunningPCB()
-        #si no hay ningun proceso corriendo
-        if(pcbRunning == None):
-            pcb.setState(RUNNING) #se cambia el estado a running del pcb
-            self.kernel.pcbTable.setRunningPcb(pcb) #y se setea el proceso actual en running en la pcb table
-            self.kernel.dispatcher.load(pcb) #el dispach lo carga en cpu
-        #cada vez que haya que agregar a la ready queue hay que preguntar si hay que expropiar (diapos)
-        elif (self.kernel.scheduler.mustExpropiate(pcbRunning, pcb)):
-            self.expropiate(pcbRunning, pcb)
-        else:
-            #se agrega a la lista de ready
-            self.kernel.scheduler.add(pcb)
+        #si hay un core libre se carga, si no se expropia o va a la ready queue
+        self.runOrAddToReady(pcb)
 
-        log.logger.info("HARDWARE after load: {hardware}".format(hardware=HARDWARE))
+        #el estado del hardware se arma solo si se va a loguear (la memoria puede ser muy grande)
+        log.logger.info("HARDWARE after load: %s", HARDWARE)
         
+class PageFaultInterruptionHandler(AbstractInterruptionHandler):
+
+    #el MMU no encontro la pagina en memoria: se carga en un frame libre y el MMU reintenta la traduccion
+    def execute(self, irq):
+        page = irq.parameters
+        pcb = self.kernel.pcbTable.getRunningPCB(irq.core)
+        self.kernel.loader.pageFault(pcb, page)
+        log.logger.info("Page {page} of PID {pid} loaded, {loader}".format(page = page, pid = pcb.getPid(), loader = self.kernel.loader))
+
+#politicas de asignacion de memoria del Loader
+FIRST_FIT = "first-fit"
+BEST_FIT = "best-fit"
+
 class Loader ():
     
-    def __init__(self):
-        self._baseDir = 0
+    #la memoria libre se administra con una lista de bloques libres [baseDir, size] ordenada por baseDir
+    def __init__(self, memorySize = None, policy = FIRST_FIT):
+        if memorySize is None:
+            memorySize = HARDWARE.memory.size
+        self._policy = policy
+        self._freeBlocks = [[0, memorySize]]
+
+    @property
+    def policy(self):
+        return self._policy
+
+    ## Carga el programa en memoria y deja en el pcb donde quedo (baseDir y limit)
+    def load(self, pcb, program):
+        baseDir = self.load_program(program)
+        pcb.setBaseDir(baseDir)
+        pcb.setLimit(len(program.instructions) - 1)
 
     ## Carga el prograa dado en memoria
     def load_program(self, program):
-        ## 
+        ## si la memoria es compacta se escribe el programa ya codificado
+        if HARDWARE.memory.compact:
+            instructions = program.opcodes
+        else:
+            instructions = program.instructions
+        progSize = len(instructions)
+        baseDir = self.allocate(progSize)
+        HARDWARE.memory.writeBlock(baseDir, instructions)
+        return baseDir
+
+    ## Libera la memoria del proceso dado
+    def free(self, pcb):
+        self.release(pcb.getBaseDir(), pcb.getLimit() + 1)
+
+    ## Los segmentos de memoria fisica [(direccion, celdas)] del proceso, para el DMA
+    def segments(self, pcb):
+        return [(pcb.getBaseDir(), pcb.getLimit() + 1)]
+
+    #la memoria del proceso no se mueve mientras el DMA la usa
+    def pin(self, pcb):
+        pass
+
+    def unpin(self, pcb):
+        pass
+
+    ## Reserva un bloque de size celdas y retorna su baseDir
+    def allocate(self, size):
+        index = self._findBlock(size)
+        if index is None:
+            raise Exception("Not enough memory to allocate {size} cells, {stats}".format(size = size, stats = self.fragmentationStats()))
+        block = self._freeBlocks[index]
+        baseDir = block[0]
+        if block[1] == size:
+            del self._freeBlocks[index]
+        else:
+            #se achica el bloque libre desde el principio
+            block[0] += size
+            block[1] -= size
+        return baseDir
+
+    ## Devuelve un bloque a la lista de libres, uniendolo con los bloques vecinos
+    def release(self, baseDir, size):
+        index = bisect.bisect_left(self._freeBlocks, [baseDir, size])
+        block = [baseDir, size]
+        self._freeBlocks.insert(index, block)
+        #se une con el bloque siguiente
+        if index + 1 < len(self._freeBlocks) and (block[0] + block[1] == self._freeBlocks[index + 1][0]):
+            block[1] += self._freeBlocks[index + 1][1]
+            del self._freeBlocks[index + 1]
+        #se une con el bloque anterior
+        if index > 0 and (self._freeBlocks[index - 1][0] + self._freeBlocks[index - 1][1] == block[0]):
+            self._freeBlocks[index - 1][1] += block[1]
+            del self._freeBlocks[index]
+
+    def _findBlock(self, size):
+        found = None
+        for index, block in enumerate(self._freeBlocks):
+            if block[1] >= size:
+                if self._policy == FIRST_FIT:
+                    return index
+                if found is None or block[1] < self._freeBlocks[found][1]:
+                    found = index
+        return found
+
+    ## Estadisticas de fragmentacion (externa) de la memoria libre
+    def fragmentationStats(self):
+        freeCells = sum(block[1] for block in self._freeBlocks)
+        largestBlock = max((block[1] for block in self._freeBlocks), default = 0)
+        fragmentation = 0
+        if freeCells > 0:
+            fragmentation = 1 - (largestBlock / freeCells)
+        return {'freeCells': freeCells, 'freeBlocks': len(self._freeBlocks), 'largestFreeBlock': largestBlock, 'externalFragmentation': fragmentation}
+
+    def __repr__(self):
+        return "Loader({policy}) free blocks: {blocks}".format(policy = self._policy, blocks = self._freeBlocks)
+
+
+## Administra los frames libres de la memoria (paginacion)
+class FrameAllocator():
+
+    def __init__(self, frameCount):
+        self._frameCount = frameCount
+        #se sacan del final, asi los primeros frames que se entregan son los mas bajos
+        self._freeFrames = list(range(frameCount - 1, -1, -1))
+
+    @property
+    def frameCount(self):
+        return self._frameCount
+
+    @property
+    def freeFrameCount(self):
+        return len(self._freeFrames)
+
+    ## Retorna una lista de count frames libres (no tienen por que ser contiguos)
+    def allocate(self, count):
+        if count > len(self._freeFrames):
+            raise Exception("Not enough free frames, requested: {count} free: {free}".format(count = count, free = len(self._freeFrames)))
+        frames = self._freeFrames[-count:] if count > 0 else []
+        del self._freeFrames[len(self._freeFrames) - count:]
+        frames.reverse()
+        return frames
+
+    def free(self, frames):
+        self._freeFrames.extend(frames)
+
+    def __repr__(self):
+        return "FrameAllocator free frames: {free} of {total}".format(free = len(self._freeFrames), total = self._frameCount)
+
+
+## Politicas para elegir el frame victima cuando no quedan frames libres (swapping)
+##  add: se cargo una pagina en el frame / remove: el frame se libero / chooseVictim: retorna el frame a desalojar
+##  pin/unpin: el frame no se puede desalojar mientras el DMA lo usa (conserva su lugar en el orden de la politica)
+class FifoVictimPolicy():
+
+    #la victima es la pagina que hace mas tiempo que esta en memoria
+    def __init__(self):
+        self._frames = OrderedDict()
+        self._pinned = set()
+
+    def add(self, frame, entry):
+        self._frames[frame] = entry
+
+    def remove(self, frame):
+        self._frames.pop(frame, None)
+        self._pinned.discard(frame)
+
+    def pin(self, frame):
+        self._pinned.add(frame)
+
+    def unpin(self, frame):
+        self._pinned.discard(frame)
+
+    def chooseVictim(self):
+        self._checkEvictable()
+        frame = next(frame for frame in self._frames if frame not in self._pinned)
+        del self._frames[frame]
+        return frame
+
+    #si todos los frames estan fijados por el DMA no hay victima posible
+    def _checkEvictable(self):
+        if len(self._frames) == len(self._pinned):
+            raise Exception("No frame can be evicted: the {count} frames in use are pinned by DMA transfers".format(count = len(self._pinned)))
+
+    def __repr__(self):
+        return "FIFO"
+
+
+class SecondChanceVictimPolicy(FifoVictimPolicy):
+
+    #como FIFO, pero si la pagina fue referenciada se le limpia el bit y vuelve al final (algoritmo del reloj)
+    #(los frames fijados no se tocan: la aguja los saltea)
+    def chooseVictim(self):
+        self._checkEvictable()
+        while True:
+            for frame, entry in list(self._frames.items()):
+                if frame in self._pinned:
+                    continue
+                if not entry.referenced:
+                    del self._frames[frame]
+                    return frame
+                entry.referenced = False
+                self._frames.move_to_end(frame)
+
+    def __repr__(self):
+        return "Second chance"
+
+
+class LruApproxVictimPolicy(FifoVictimPolicy):
+
+    #aproximacion de LRU por envejecimiento: cada frame tiene un contador de 8 bits que se
+    #corre a la derecha y recibe el bit de referencia en el bit mas alto; la victima es el menor
+    def __init__(self):
+        super().__init__()
+        self._counters = {}
+
+    def add(self, frame, entry):
+        super().add(frame, entry)
+        self._counters[frame] = 0
+
+    def remove(self, frame):
+        super().remove(frame)
+        self._counters.pop(frame, None)
+
+    def chooseVictim(self):
+        self._checkEvictable()
+        for frame, entry in self._frames.items():
+            self._counters[frame] = (self._counters[frame] >> 1) | (0x80 if entry.referenced else 0)
+            entry.referenced = False
+        frame = min((frame for frame in self._frames if frame not in self._pinned), key = lambda frame: self._counters[frame])
+        self.remove(frame)
+        return frame
+
+    def __repr__(self):
+        return "LRU approx"
+
+
+## Loader para memoria paginada: cada pagina del programa se carga en cualquier frame libre
+##  - con demandPaging no se carga nada al crear el proceso: cada pagina se carga
+##    cuando el MMU la necesita (#PAGE_FAULT)
+##  - con swap, si no hay frames libres se desaloja la pagina que elija la victimPolicy;
+##    se guarda en el swap (page-out) salvo que el swap ya tenga una copia al dia (tiene slot y no esta sucia),
+##    y cuando se vuelve a necesitar se lee del swap (page-in)
+class PagedLoader():
+
+    def __init__(self, frameAllocator, frameSize, demandPaging = False, swap = None, victimPolicy = None):
+        self._frameAllocator = frameAllocator
+        self._frameSize = frameSize
+        self._demandPaging = demandPaging
+        self._wastedCells = 0
+        self._swap = swap
+        self._victimPolicy = victimPolicy if victimPolicy is not None else FifoVictimPolicy()
+        self._frameTable = {}       # frame -> (pcb, pagina) de las paginas cargadas
+        self._freeSwapSlots = []
+        self._swapSlotCount = 0
+        self._pageFaults = 0
+        self._pageIns = 0
+        self._pageOuts = 0
+        self._evictions = 0
+
+    @property
+    def demandPaging(self):
+        return self._demandPaging
+
+    ## Arma la tabla de paginas del proceso (y carga las paginas si no es por demanda)
+    def load(self, pcb, program):
         progSize = len(program.instructions)
-        for index in range(0, progSize):
-            inst = program.instructions[index]
-            HARDWARE.memory.write(self._baseDir, inst)
-            self._baseDir += 1
-        return self._baseDir - progSize 
-    
+        pageCount = -(-progSize // self._frameSize)
+        pcb.setPageTable([PageTableEntry() for page in range(0, pageCount)])
+        pcb.setLimit(progSize - 1)
+        if not self._demandPaging:
+            for page in range(0, pageCount):
+                self.loadPage(pcb, page)
+
+    ## El MMU no encontro la pagina en memoria
+    def pageFault(self, pcb, page):
+        self._pageFaults += 1
+        self.loadPage(pcb, page)
+
+    ## Carga una pagina del proceso en un frame libre: desde el swap si tiene una copia, si no desde el programa
+    def loadPage(self, pcb, page):
+        entry = pcb.getPageTable()[page]
+        frame = self._allocateFrame()
+        if entry.swapSlot is not None:
+            pageCells = self._swap.read(entry.swapSlot)[:self._pageSize(pcb, page)]
+            if not HARDWARE.memory.compact:
+                pageCells = ASM.decode(pageCells)
+            self._pageIns += 1
+        else:
+            program = pcb.getProgram()
+            if HARDWARE.memory.compact:
+                instructions = program.opcodes
+            else:
+                instructions = program.instructions
+            pageStart = page * self._frameSize
+            pageCells = instructions[pageStart:pageStart + self._frameSize]
+        HARDWARE.memory.writeBlock(frame * self._frameSize, pageCells)
+        self._wastedCells += self._frameSize - len(pageCells)
+        entry.frame = frame
+        entry.referenced = False
+        entry.dirty = False
+        self._frameTable[frame] = (pcb, page)
+        self._victimPolicy.add(frame, entry)
+
+    ## Libera los frames (y el swap) del proceso dado
+    def free(self, pcb):
+        frames = []
+        for page, entry in enumerate(pcb.getPageTable()):
+            if entry.isResident:
+                frames.append(entry.frame)
+                self._wastedCells -= self._frameSize - self._pageSize(pcb, page)
+                self._victimPolicy.remove(entry.frame)
+                del self._frameTable[entry.frame]
+                entry.frame = None
+            if entry.swapSlot is not None:
+                self._freeSwapSlots.append(entry.swapSlot)
+                entry.swapSlot = None
+        self._frameAllocator.free(frames)
+        for cpu in HARDWARE.cpus:
+            cpu.mmu.invalidate(pcb.getPid())
+
+    ## Los segmentos de memoria fisica [(direccion, celdas)] de todas las paginas del proceso, para el DMA
+    #(las paginas en frames consecutivos quedan en un solo segmento; pin ya cargo las que no estaban en memoria)
+    def segments(self, pcb):
+        segments = []
+        for page, entry in enumerate(pcb.getPageTable()):
+            if not entry.isResident:
+                raise Exception("Page {page} of PID {pid} is not in memory, the process has to be pinned before the transfer".format(page = page, pid = pcb.getPid()))
+            address = entry.frame * self._frameSize
+            size = self._pageSize(pcb, page)
+            if segments and (segments[-1][0] + segments[-1][1] == address):
+                segments[-1] = (segments[-1][0], segments[-1][1] + size)
+            else:
+                segments.append((address, size))
+        return segments
+
+    ## Las paginas del proceso no se pueden desalojar mientras el DMA las usa: se cargan las que falten
+    #(desde el swap o el programa) y se fijan de a una, asi cargar una no desaloja otra ya fijada
+    def pin(self, pcb):
+        for page, entry in enumerate(pcb.getPageTable()):
+            if not entry.isResident:
+                self.loadPage(pcb, page)
+            self._victimPolicy.pin(entry.frame)
+
+    def unpin(self, pcb):
+        for entry in pcb.getPageTable():
+            if entry.isResident:
+                self._victimPolicy.unpin(entry.frame)
+
+    def _pageSize(self, pcb, page):
+        return min(pcb.getLimit() + 1, (page + 1) * self._frameSize) - page * self._frameSize
+
+    def _allocateFrame(self):
+        if (self._frameAllocator.freeFrameCount == 0) and (self._swap is not None):
+            self._evict(self._victimPolicy.chooseVictim())
+        return self._frameAllocator.allocate(1)[0]
+
+    ## Desaloja la pagina que esta en el frame dado (page-out si esta sucia) y libera el frame
+    def _evict(self, frame):
+        pcb, page = self._frameTable.pop(frame)
+        entry = pcb.getPageTable()[page]
+        #page-out si el swap no tiene una copia al dia (nunca se guardo o se escribio despues)
+        if entry.dirty or (entry.swapSlot is None):
+            if entry.swapSlot is None:
+                entry.swapSlot = self._allocateSwapSlot()
+            pageCells = HARDWARE.memory.readBlock(frame * self._frameSize, self._frameSize)
+            if not HARDWARE.memory.compact:
+                pageCells = ASM.encode(pageCells)
+            self._swap.write(entry.swapSlot, pageCells)
+            self._pageOuts += 1
+        self._wastedCells -= self._frameSize - self._pageSize(pcb, page)
+        entry.frame = None
+        entry.dirty = False
+        for cpu in HARDWARE.cpus:
+            cpu.mmu.invalidate(pcb.getPid(), page)
+        self._frameAllocator.free([frame])
+        self._evictions += 1
+        log.logger.info("Page {page} of PID {pid} evicted from frame {frame}".format(page = page, pid = pcb.getPid(), frame = frame))
+
+    def _allocateSwapSlot(self):
+        if self._freeSwapSlots:
+            return self._freeSwapSlots.pop()
+        self._swapSlotCount += 1
+        return self._swapSlotCount - 1
+
+    ## con paginacion no hay fragmentacion externa, solo interna (el final de la ultima pagina)
+    def fragmentationStats(self):
+        usedCells = (self._frameAllocator.frameCount - self._frameAllocator.freeFrameCount) * self._frameSize
+        fragmentation = 0
+        if usedCells > 0:
+            fragmentation = self._wastedCells / usedCells
+        return {'freeFrames': self._frameAllocator.freeFrameCount, 'freeCells': self._frameAllocator.freeFrameCount * self._frameSize, 'internalFragmentation': fragmentation}
+
+    ## Estadisticas de paginacion, para dimensionar memoria vs swap
+    def swapStats(self):
+        return {'victimPolicy': repr(self._victimPolicy), 'pageFaults': self._pageFaults, 'pageIns': self._pageIns, 'pageOuts': self._pageOuts,
+                'evictions': self._evictions, 'swapSlots': self._swapSlotCount - len(self._freeSwapSlots)}
+
+    def __repr__(self):
+        return "PagedLoader(frameSize={frameSize}) {allocator}".format(frameSize = self._frameSize, allocator = self._frameAllocator)
+
 
 class  Dispatcher():
 
-    #Carga el pcb dado en la CPU
-    def load(self, pcb):
-        HARDWARE.cpu.pc = pcb.getPc()               #PRACTICA 3: Se crea una variable en la cual se obtiene el PC del PCB
-        HARDWARE.mmu.baseDir = pcb.getBaseDir()     #PRACTICA 3: Se crea una variabla en la cual se obtiene la baseDir del MMU   
-        HARDWARE.timer.reset()
+    def __init__(self, kernel):
+        self._kernel = kernel
+
+    #Carga el pcb dado en la CPU (en el core dado, cada core tiene su MMU y su timer)
+    def load(self, pcb, core = 0):
+        cpu = HARDWARE.cpus[core]
+        cpu.pc = pcb.getPc()                        #PRACTICA 3: Se crea una variable en la cual se obtiene el PC del PCB
+        cpu.mmu.baseDir = pcb.getBaseDir()          #PRACTICA 3: Se crea una variabla en la cual se obtiene la baseDir del MMU   
+        cpu.mmu.switchContext(pcb.getPid(), pcb.getPageTable()) #con paginacion el MMU traduce con la tabla de paginas del proceso (y la TLB)
+        cpu.mmu.limit = pcb.getLimit()              #el proceso solo puede leer sus propias celdas
+        self._startQuantum(pcb, core)
+        #si el proceso corrio por ultima vez en otro core, migro (el scheduler cobra el costo)
+        lastCore = pcb.getLastCore()
+        if (lastCore is not None) and (lastCore != core):
+            self._kernel.scheduler.migrated(pcb, lastCore, core)
+        pcb.setLastCore(core)
          
+    #el proceso que corre en el core sigue corriendo, con un quantum nuevo
+    def renewQuantum(self, pcb, core = 0):
+        self._account(pcb, core)
+        self._startQuantum(pcb, core)
+
+    #reinicia el timer del core, con el quantum que el scheduler le da al proceso (si no define uno queda el del timer)
+    def _startQuantum(self, pcb, core):
+        timer = HARDWARE.timers[core]
+        quantum = self._kernel.scheduler.quantumFor(pcb)
+        if quantum is not None:
+            timer.quantum = quantum
+        timer.reset()
+
+    #el timer cuenta los ticks que el proceso estuvo en el cpu desde que se cargo (o desde su ultimo quantum)
+    def _account(self, pcb, core):
+        timer = HARDWARE.timers[core]
+        ticks = timer.tickCount
+        pcb.setCpuTime(pcb.getCpuTime() + ticks)
+        self._kernel.scheduler.ran(pcb, ticks)
+        timer.reset()
+
     ## Salva el estado de PC en un PCB dado y pone el CPU en IDLE
-    def save(self, pcb):
-        pcb.setPc(HARDWARE.cpu.pc)      #PRACTICA 3: Actualiza el PC del PCB
-        HARDWARE.cpu.pc = -1                #PRACTICA 3: Se setea el PC del CPU en -1, poniéndolo en IDLE 
+    def save(self, pcb, core = 0):
+        cpu = HARDWARE.cpus[core]
+        pcb.setPc(cpu.pc)      #PRACTICA 3: Actualiza el PC del PCB
+        cpu.pc = -1                #PRACTICA 3: Se setea el PC del CPU en -1, poniéndolo en IDLE 
+        self._account(pcb, core)
 
 
 class PCB():
@@ -302,6 +920,15 @@ class PCB():
         self._pc        = pc
         self._state     = state
         self._prioridad = prioridad # ahora los programas tienen prioridad
+        self._limit     = 0
+        self._pageTable = None      # solo se usa con paginacion
+        self._program   = None      # el programa que ejecuta el proceso
+        self._lastCore  = None      # el ultimo core donde corrio
+        self._affinity  = None      # los cores donde puede correr (None: cualquiera)
+        self._cpuTime   = 0         # ticks que estuvo en el cpu
+        self._vruntime  = 0         # tiempo de cpu pesado por la prioridad (scheduler CFS)
+        self._deadline  = None      # tick en el que tiene que haber terminado (tiempo real)
+        self._shares    = None      # parte del cpu que le toca (lottery/stride), None: sale de la prioridad
      
       #tp 4 guardamos los ticks de cada programa en su pcb
     def getTick(self):
@@ -326,6 +953,10 @@ class PCB():
     def getBaseDir(self):
         return self._baseDir
 
+    #Getter de limit (ultima direccion logica del proceso)
+    def getLimit(self):
+        return self._limit
+
     #Getter de state
     def getState(self):
         return(self._state)
@@ -341,6 +972,83 @@ class PCB():
     #Setter de baseDir
     def setBaseDir(self, bDir): #modificarBaseDir
         self._baseDir = bDir
+
+    #Setter de limit
+    def setLimit(self, limit):
+        self._limit = limit
+
+    #Getter de la tabla de paginas (lista de PageTableEntry, el indice es la pagina)
+    def getPageTable(self):
+        return self._pageTable
+
+    #Setter de la tabla de paginas
+    def setPageTable(self, pageTable):
+        self._pageTable = pageTable
+
+    #Getter del programa
+    def getProgram(self):
+        return self._program
+
+    #Setter del programa
+    def setProgram(self, program):
+        self._program = program
+
+    #Getter del ultimo core donde corrio
+    def getLastCore(self):
+        return self._lastCore
+
+    #Setter del ultimo core donde corrio
+    def setLastCore(self, core):
+        self._lastCore = core
+
+    #Getter de la afinidad (conjunto de cores, None si puede correr en cualquiera)
+    def getAffinity(self):
+        return self._affinity
+
+    #Setter de la afinidad
+    def setAffinity(self, cores):
+        cores = set(cores)
+        if not cores:
+            raise Exception("PID {pid} needs at least one core in its affinity".format(pid = self._pid))
+        self._affinity = cores
+
+    #Getter del tiempo de cpu (en ticks)
+    def getCpuTime(self):
+        return self._cpuTime
+
+    #Setter del tiempo de cpu
+    def setCpuTime(self, cpuTime):
+        self._cpuTime = cpuTime
+
+    #Getter del tiempo virtual (CFS)
+    def getVruntime(self):
+        return self._vruntime
+
+    #Setter del tiempo virtual
+    def setVruntime(self, vruntime):
+        self._vruntime = vruntime
+
+    #Getter del deadline (tick absoluto, None si no es de tiempo real)
+    def getDeadline(self):
+        return self._deadline
+
+    #Setter del deadline
+    def setDeadline(self, deadline):
+        self._deadline = deadline
+
+    #Getter de las shares (None si no se definieron)
+    def getShares(self):
+        return self._shares
+
+    #Setter de las shares (son tickets: un entero positivo)
+    def setShares(self, shares):
+        if isinstance(shares, bool) or not isinstance(shares, int) or (shares <= 0):
+            raise Exception("PID {pid} needs a positive int amount of shares, got {shares}".format(pid = self._pid, shares = shares))
+        self._shares = shares
+
+    #retorna si el proceso puede correr en el core dado
+    def canRunOn(self, core):
+        return (self._affinity is None) or (core in self._affinity)
         
      # Setter de PID
     def setPid(self, pid):
@@ -353,10 +1061,10 @@ class PCB():
 
 class PcbTable():
 
-    def __init__(self):
+    def __init__(self, cores = 1):
         self._pidCounter = 0 
         self._table = {}  # Usamos un diccionario en lugar de una lista
-        self._runningPcb = None
+        self._runningPcbs = [None] * cores  # el pcb que corre en cada core
 
     def getTable(self):
         return(self._table)
@@ -364,11 +1072,22 @@ class PcbTable():
     def get(self, pid):
         return self._table.get(pid)  # Accedemos directamente al PCB por su PID
 
-    def setRunningPcb(self, arg):
-        self._runningPcb = arg
+    def setRunningPcb(self, arg, core = 0):
+        self._runningPcbs[core] = arg
 
-    def getRunningPCB(self):
-        return self._runningPcb
+    def getRunningPCB(self, core = 0):
+        return self._runningPcbs[core]
+
+    def getRunningPCBs(self):
+        return self._runningPcbs
+
+    #retorna el primer core que no tiene proceso corriendo (None si estan todos ocupados)
+    #si se pasa una afinidad, solo se consideran esos cores
+    def idleCore(self, affinity = None):
+        for core, pcb in enumerate(self._runningPcbs):
+            if (pcb is None) and ((affinity is None) or (core in affinity)):
+                return core
+        return None
 
     def add(self, pcb):
         new_pid = self.getNewPID()  # Obtenemos un nuevo PID
@@ -502,6 +1221,53 @@ class Scheduler():
     def isEmpty(self):
         pass
 
+    #con varios cores cada core pide su proximo proceso, por defecto la ready queue es compartida
+    def nextInQueueFor(self, core):
+        return self.nextInQueue()
+
+    def isEmptyFor(self, core):
+        return self.isEmpty()
+
+    #si nextInQueueFor respeta la afinidad de los procesos (una ready queue compartida se la da a cualquier core)
+    def supportsAffinity(self):
+        return False
+
+    #el dispatcher avisa que el pcb paso a correr en otro core
+    def migrated(self, pcb, fromCore, toCore):
+        pass
+
+    #el proceso que corria uso todo su quantum
+    def quantumExpired(self, pcb):
+        pass
+
+    #el proceso que corria se bloqueo por I/O
+    def blockedOnIo(self, pcb):
+        pass
+
+    #el quantum con el que corre el proceso (None: el que tenga el timer)
+    def quantumFor(self, pcb):
+        return None
+
+    #el dispatcher avisa cuantos ticks estuvo el proceso en el cpu
+    def ran(self, pcb, ticks):
+        pass
+
+    #llego un proceso nuevo (todavia no esta en la ready queue, puede ir directo a un core)
+    def created(self, pcb):
+        pass
+
+    #el proceso termino
+    def terminated(self, pcb):
+        pass
+
+    #test de admision de una tarea periodica (el programa se libera cada period ticks y tiene deadline ticks para terminar)
+    def admit(self, program, deadline, period):
+        return True
+
+    #la tarea periodica ya no se libera mas (su ultima liberacion llego a su deadline)
+    def withdraw(self, program, deadline, period):
+        pass
+
     def mustExpropiate(self, pcbRunning, pcb ):
         return False
 
@@ -512,55 +1278,112 @@ class Scheduler():
 class SchedulerFiFo(Scheduler):
     
     def __init__(self):
-        self._readyQueue = []
+        self._readyQueue = deque() #la deque saca del principio en tiempo constante (list.pop(0) mueve toda la lista)
     
     def add(self, pcb):
         self._readyQueue.append(pcb)
     
     def nextInQueue(self):
-        return({'pcb': self._readyQueue.pop(0)})
+        return({'pcb': self._readyQueue.popleft()})
     
     def isEmpty(self):
         return(len(self._readyQueue) == 0)  
     
     
 class SchedulerPriorityNoExp(Scheduler): 
-    def __init__(self):
-        self._readyQueue = [[], [], [], [], []] #la cantidad de listas es equivalente a las prioridades, adentro hay diccionarios/ max prioridad 5/ indice de 0 a 4
-        self._ticksParaEnvejecer = 4 #cada 4 ticks envejece el programa
+    #levels: cantidad de prioridades (1 es la maxima), hay una cola por prioridad
+    #el bitmap tiene el bit i prendido si la cola de prioridad i+1 tiene procesos, asi add, nextInQueue e isEmpty no recorren las colas
+    #aging: cada cuantos ticks de espera un proceso sube una prioridad
+    def __init__(self, levels = 5, aging = 4):
+        self._levels = levels
+        self._aging = aging
+        self._readyQueue = [deque() for level in range(levels)] #adentro hay diccionarios/ indice de 0 a levels-1
+        self._counts = [0] * levels #procesos vivos en cada cola (al envejecer queda una entrada vieja en la cola anterior)
+        self._bitmap = 0
+        #rueda de envejecimiento: tick en el que hay que subir de prioridad -> procesos, y un heap con esos ticks
+        #en cada tick solo se mira el primer tick del heap, no se recorren las colas
+        self._agingBuckets = {}
+        self._agingDeadlines = []
+
+    @property
+    def levels(self):
+        return self._levels
         
     def add(self, pcb):
         priority = pcb.getPriority()
-        psItem = {'tick': HARDWARE.clock.currentTick, 'pcb': pcb, 'priority': priority} #se crea un diccionario, el harware.clock guarda el tiempo actual
+        if not (1 <= priority <= self._levels):
+            raise Exception("Priority {priority} of PID {pid} out of range 1..{levels}".format(priority = priority, pid = pcb.getPid(), levels = self._levels))
+        psItem = {'tick': HARDWARE.clock.currentTick, 'pcb': pcb, 'priority': priority, 'queued': True} #se crea un diccionario, el harware.clock guarda el tiempo actual
                    #clave-valor
-        self._readyQueue[priority - 1].append(psItem) #se agrega a la ready que en su prioridad correspondiente, se le resta 1 porque el indice empieza en 0
+        self._push(priority - 1, psItem) #se agrega a la ready que en su prioridad correspondiente, se le resta 1 porque el indice empieza en 0
+        if priority > 1:
+            self._scheduleAging(psItem['tick'] + self._aging, psItem)
+
+    def _push(self, index, psItem):
+        self._readyQueue[index].append(psItem)
+        self._counts[index] += 1
+        self._bitmap |= (1 << index)
+
+    def _remove(self, index):
+        self._counts[index] -= 1
+        if self._counts[index] == 0:
+            self._bitmap &= ~(1 << index)
+
+    def _pop(self, index):
+        queue = self._readyQueue[index]
+        #se descartan las entradas de procesos que ya subieron de prioridad
+        while queue[0]['priority'] - 1 != index:
+            queue.popleft()
+        psItem = queue.popleft()
+        psItem['queued'] = False
+        self._remove(index)
+        return psItem
+
+    def _scheduleAging(self, deadline, psItem):
+        bucket = self._agingBuckets.get(deadline)
+        if bucket is None:
+            bucket = []
+            self._agingBuckets[deadline] = bucket
+            heapq.heappush(self._agingDeadlines, deadline)
+            #el clock por eventos no saltea el tick de envejecimiento
+            HARDWARE.clock.schedule(deadline, self.checkTick)
+        bucket.append(psItem)
     
     def checkTick(self):
-        if self.ticksParaEnvejecer == 0: #chequeamos si ya se hicieron los ticks correspondientes
-            self.tiempoParaEnvejecer() #se envejece
-            self.ticksParaEnvejecer = 4 #se reinicia
-        else:
-            self.ticksParaEnvejecer -= 1 #se descuenta de uno en uno
+        self.tiempoParaEnvejecer(HARDWARE.clock.currentTick)
     
-    def tiempoParaEnvejecer(self):
-        indice = 1
-        while (indice < 5): #mientras indice sea < 5, los indices empiezan desde 0
-            self.envejecer(self._readyQueue[indice], self._readyQueue[indice - 1]) #envejecemos los programa que esten la lista del indice (indice) dado y le pasamos la lista anterior (prioridad que le sigue) por si tiene que cambiarlo de prioridad
-            indice += 1
+    #envejece los procesos cuyo tick de envejecimiento ya paso
+    def tiempoParaEnvejecer(self, currentTick):
+        while self._agingDeadlines and (self._agingDeadlines[0] <= currentTick):
+            deadline = heapq.heappop(self._agingDeadlines)
+            for psItem in self._agingBuckets.pop(deadline):
+                if psItem['queued']: #los que ya salieron de la ready queue no envejecen
+                    self.envejecer(psItem, deadline, currentTick)
     
-    def envejecer(self, arr, poner): # la lista de procesos actuales y el los que le siguen por prioridad
-        while bool(arr) and (4 + arr[0]['tick'] <= HARDWARE.clock.currentTick): #mientras no sea vacía y el tick con el que entro el primer elemento (un programa) de la lista + 4 (tiempo de ticks para envejecer)
-            #me fijo a cuantos ticks el programa deberia envejecer, sumandole desde que entro mas lo que tiene que esperar, si los ticks actuales son mayores a los que tenia que esperar el programa, se envejece porque ya paso el tiempo de espera
-            arr[0]['priority'] -= 1 #al primer programa del array, le aumento su prioridad
-            poner.append(arr.pop(0))  #se pone y se borra con pop
+    def envejecer(self, psItem, deadline, currentTick):
+        #si se saltearon ticks (clock por eventos) sube todas las prioridades que le correspondian
+        steps = (currentTick - deadline) // self._aging + 1
+        index = psItem['priority'] - 1
+        newIndex = max(0, index - steps)
+        self._remove(index) #la entrada en la cola vieja se descarta cuando llega al principio
+        psItem['priority'] = newIndex + 1 #le aumento su prioridad
+        #si en la cola vieja hay mas entradas descartadas que vivas se limpia (si nunca llegan al principio la cola crece sin limite)
+        queue = self._readyQueue[index]
+        if len(queue) > 2 * self._counts[index]:
+            self._readyQueue[index] = deque(item for item in queue if item['priority'] - 1 == index)
+        self._push(newIndex, psItem)
+        if newIndex > 0:
+            self._scheduleAging(deadline + steps * self._aging, psItem)
     
     def nextInQueue(self):
-        for index in self._readyQueue:
-            if bool(index): #mientras no este vacia
-                return index.pop(0) #retorna y elimina el primer elemento 
+        #el envejecimiento se pone al dia (el clock por eventos no llama a checkTick en los ticks salteados)
+        self.tiempoParaEnvejecer(HARDWARE.clock.currentTick)
+        #el bit prendido mas bajo es la cola de mayor prioridad con procesos
+        indice = (self._bitmap & -self._bitmap).bit_length() - 1
+        return self._pop(indice) #retorna y elimina el primer elemento 
     
     def isEmpty(self):
-        return not (self._readyQueue[0] or self._readyQueue[1] or self._readyQueue[2] or self._readyQueue[3] or self._readyQueue[4]) 
+        return self._bitmap == 0 
                 
 class SchedulerPriorityExp(SchedulerPriorityNoExp):
     
@@ -574,13 +1397,518 @@ class SchedulerRoundRobin(SchedulerFiFo):
         self.setearTimer(3)         #Seteo el quantum en 3 y activo el timer.
     
     def setearTimer(self, quantum):     
-        HARDWARE.timer.quantum(self, quantum)   #se activa el timer para que empiece a contar los ticks y si son mayores o iguales al quantum, manda una interrupcion de time out  para expropiar   
+        for timer in HARDWARE.timers:
+            timer.quantum = quantum     #se activa el timer (de cada core) para que empiece a contar los ticks y si son mayores o iguales al quantum, manda una interrupcion de time out  para expropiar   
    
 
+#una ready queue por core: cada core toma de la suya y, si quedo vacia, le roba al core mas cargado (work stealing)
+#migrationCost: ticks que el core queda parado al cargar un proceso que venia de otro core (se pierde la cache)
+class SchedulerPerCore(Scheduler):
+
+    def __init__(self, migrationCost = 0):
+        self._readyQueues = [deque() for cpu in HARDWARE.cpus]
+        #core -> (victima, indice) que encontro _findStealable, vale hasta que cambie alguna cola
+        #(isEmptyFor y despues nextInQueueFor no buscan dos veces)
+        self._stealable = {}
+        self._migrationCost = migrationCost
+        self._steals = 0
+        self._migrations = 0
+
+    #se encola en el core permitido con menos procesos, desempatando por el ultimo core donde corrio
+    def add(self, pcb):
+        cores = [core for core in range(len(self._readyQueues)) if pcb.canRunOn(core)]
+        if not cores:
+            raise Exception("PID {pid} has no core to run on, affinity: {affinity}".format(pid = pcb.getPid(), affinity = pcb.getAffinity()))
+        core = min(cores, key = lambda c: (len(self._readyQueues[c]), c != pcb.getLastCore()))
+        self._readyQueues[core].append(pcb)
+        self._stealable.clear()
+
+    def nextInQueueFor(self, core):
+        queue = self._readyQueues[core]
+        if queue:
+            self._stealable.clear()
+            return {'pcb': queue.popleft()}
+        victim, index = self._findStealable(core)
+        if victim is None:
+            return None
+        self._stealable.clear()
+        victimQueue = self._readyQueues[victim]
+        pcb = victimQueue[index]
+        del victimQueue[index]
+        self._steals += 1
+        log.logger.info("core {core} stole PID {pid} from core {victim}".format(core = core, pid = pcb.getPid(), victim = victim))
+        return {'pcb': pcb}
+
+    def isEmptyFor(self, core):
+        return not self._readyQueues[core] and (self._findStealable(core)[0] is None)
+
+    def supportsAffinity(self):
+        return True
+
+    #sin core (no deberia pasar con varios cores) se toma del mas cargado
+    def nextInQueue(self):
+        queue = max(self._readyQueues, key = len)
+        self._stealable.clear()
+        return {'pcb': queue.popleft()}
+
+    def isEmpty(self):
+        return not any(self._readyQueues)
+
+    def migrated(self, pcb, fromCore, toCore):
+        self._migrations += 1
+        if self._migrationCost > 0:
+            HARDWARE.cpus[toCore].stall(self._migrationCost)
+
+    #busca en el core mas cargado (desde el final de su cola, lo que menos va a esperar ahi) un proceso que pueda correr en core
+    def _findStealable(self, core):
+        found = self._stealable.get(core)
+        if found is None:
+            found = self._searchStealable(core)
+            self._stealable[core] = found
+        return found
+
+    def _searchStealable(self, core):
+        victims = sorted(range(len(self._readyQueues)), key = lambda c: len(self._readyQueues[c]), reverse = True)
+        for victim in victims:
+            queue = self._readyQueues[victim]
+            for index in range(len(queue) - 1, -1, -1):
+                if queue[index].canRunOn(core):
+                    return victim, index
+        return None, None
+
+    def stats(self):
+        return {'steals': self._steals, 'migrations': self._migrations,
+                'queueLengths': [len(queue) for queue in self._readyQueues],
+                'utilization': [cpu.utilization for cpu in HARDWARE.cpus]}
+
+    def __repr__(self):
+        return "SchedulerPerCore({queues})".format(queues = [list(queue) for queue in self._readyQueues])
+
+
+#Multilevel feedback queue: una cola por nivel (0 es el de mas prioridad), cada nivel con su quantum
+#un proceso que usa todo su quantum baja de nivel, uno que se bloquea por I/O sube, asi los interactivos quedan arriba
+#cada boostInterval ticks todos vuelven al nivel 0 para que los procesos largos no se mueran de hambre
+class SchedulerMLFQ(Scheduler):
+
+    def __init__(self, quanta = (2, 4, 8), boostInterval = 50):
+        self._quanta = list(quanta)
+        self._readyQueue = [deque() for quantum in self._quanta]
+        self._pcbLevels = {}
+        self._boostInterval = boostInterval
+        self._nextBoost = boostInterval
+
+    @property
+    def quanta(self):
+        return self._quanta
+
+    def levelOf(self, pcb):
+        return self._pcbLevels.get(pcb, 0)
+
+    def add(self, pcb):
+        self._readyQueue[self.levelOf(pcb)].append(pcb)
+
+    def nextInQueue(self):
+        for queue in self._readyQueue:
+            if queue:
+                return {'pcb': queue.popleft()}
+
+    def isEmpty(self):
+        return not any(self._readyQueue)
+
+    #un proceso que llega a un nivel mas alto que el que corre lo expropia
+    def mustExpropiate(self, pcbRunning, pcb):
+        return self.levelOf(pcb) < self.levelOf(pcbRunning)
+
+    def quantumExpired(self, pcb):
+        self._pcbLevels[pcb] = min(self.levelOf(pcb) + 1, len(self._quanta) - 1)
+
+    def blockedOnIo(self, pcb):
+        self._pcbLevels[pcb] = max(self.levelOf(pcb) - 1, 0)
+
+    def quantumFor(self, pcb):
+        return self._quanta[self.levelOf(pcb)]
+
+    def terminated(self, pcb):
+        self._pcbLevels.pop(pcb, None)
+
+    def checkTick(self):
+        currentTick = HARDWARE.clock.currentTick
+        if currentTick >= self._nextBoost:
+            self.boost()
+            #si se saltearon ticks (clock por eventos) el proximo boost es el primero despues del tick actual
+            self._nextBoost += ((currentTick - self._nextBoost) // self._boostInterval + 1) * self._boostInterval
+
+    #todos los procesos vuelven al nivel 0, respetando el orden en que estaban
+    def boost(self):
+        self._pcbLevels.clear()
+        first = self._readyQueue[0]
+        for queue in self._readyQueue[1:]:
+            first.extend(queue)
+            queue.clear()
+
+    def __repr__(self):
+        return "SchedulerMLFQ({queues})".format(queues = [list(queue) for queue in self._readyQueue])
+
+
+#Completely fair scheduler: cada proceso acumula un tiempo virtual (vruntime), que es su tiempo de cpu
+#pesado por la prioridad (prioridad 1 pesa mas, su vruntime crece mas lento), y corre el de menor vruntime
+#la ready queue es un heap por vruntime (add y nextInQueue son O(log n))
+#el quantum no es fijo: targetLatency se reparte entre los procesos listos segun su peso (nunca menos de minGranularity)
+class SchedulerCFS(Scheduler):
+
+    NICE_0_WEIGHT = 1024
+
+    def __init__(self, targetLatency = 12, minGranularity = 1):
+        self._targetLatency = targetLatency
+        self._minGranularity = minGranularity
+        self._readyQueue = []
+        self._seq = 0
+        self._queuedWeight = 0
+        self._minVruntime = 0
+
+    #cada prioridad pesa un 25% menos que la anterior (como los nice de Linux)
+    def weightOf(self, pcb):
+        return self.NICE_0_WEIGHT / (1.25 ** (pcb.getPriority() - 1))
+
+    @property
+    def minVruntime(self):
+        return self._minVruntime
+
+    def add(self, pcb):
+        #un proceso nuevo o que vuelve de I/O no puede quedar muy atras de los demas (acapararia el cpu)
+        pcb.setVruntime(max(pcb.getVruntime(), self._minVruntime))
+        heapq.heappush(self._readyQueue, (pcb.getVruntime(), self._seq, pcb))
+        self._seq += 1
+        self._queuedWeight += self.weightOf(pcb)
+
+    def nextInQueue(self):
+        vruntime, seq, pcb = heapq.heappop(self._readyQueue)
+        self._queuedWeight -= self.weightOf(pcb)
+        self._minVruntime = max(self._minVruntime, vruntime)
+        return {'pcb': pcb}
+
+    def isEmpty(self):
+        return not self._readyQueue
+
+    def ran(self, pcb, ticks):
+        pcb.setVruntime(pcb.getVruntime() + ticks * self.NICE_0_WEIGHT / self.weightOf(pcb))
+
+    def quantumFor(self, pcb):
+        weight = self.weightOf(pcb)
+        timeslice = self._targetLatency * weight / (self._queuedWeight + weight)
+        return max(self._minGranularity, round(timeslice))
+
+    def __repr__(self):
+        return "SchedulerCFS({queue})".format(queue = [(pcb.getPid(), vruntime) for vruntime, seq, pcb in sorted(self._readyQueue)])
+
+
+#Shortest job first: corre el proceso con la proxima rafaga de CPU mas corta (la ready queue es un heap por rafaga)
+#la rafaga se conoce exacta porque el programa esta completo, con predict=True se estima con promedio exponencial
+#de las rafagas anteriores: estimacion = alpha * ultima rafaga + (1 - alpha) * estimacion anterior
+class SchedulerSJF(Scheduler):
+
+    def __init__(self, predict = False, alpha = 0.5, initialPrediction = 5):
+        self._predict = predict
+        self._alpha = alpha
+        self._initialPrediction = initialPrediction
+        self._readyQueue = []
+        self._seq = 0
+        self._predictions = {}
+        self._currentBursts = {}  #ticks de cpu de la rafaga en curso de cada proceso
+
+    @property
+    def predict(self):
+        return self._predict
+
+    #la proxima rafaga de CPU del proceso (desde su pc)
+    def nextBurst(self, pcb):
+        if self._predict:
+            return self._predictions.get(pcb, self._initialPrediction) - self._currentBursts.get(pcb, 0)
+        return pcb.getProgram().cpuBurstFrom(pcb.getPc())
+
+    def add(self, pcb):
+        heapq.heappush(self._readyQueue, (self.nextBurst(pcb), self._seq, pcb))
+        self._seq += 1
+
+    def nextInQueue(self):
+        burst, seq, pcb = heapq.heappop(self._readyQueue)
+        return {'pcb': pcb}
+
+    def isEmpty(self):
+        return not self._readyQueue
+
+    def ran(self, pcb, ticks):
+        self._currentBursts[pcb] = self._currentBursts.get(pcb, 0) + ticks
+
+    #termino la rafaga: se actualiza la estimacion con lo que realmente duro
+    def blockedOnIo(self, pcb):
+        burst = self._currentBursts.pop(pcb, 0)
+        prediction = self._predictions.get(pcb, self._initialPrediction)
+        self._predictions[pcb] = self._alpha * burst + (1 - self._alpha) * prediction
+
+    def terminated(self, pcb):
+        self._predictions.pop(pcb, None)
+        self._currentBursts.pop(pcb, None)
+
+    def __repr__(self):
+        return "{name}({queue})".format(name = self.__class__.__name__, queue = [(pcb.getPid(), burst) for burst, seq, pcb in sorted(self._readyQueue)])
+
+
+#Shortest remaining time first: el SJF expropiativo, si llega un proceso con una rafaga mas corta que lo que
+#le falta al que corre, lo expropia
+class SchedulerSRTF(SchedulerSJF):
+
+    #lo que le falta de rafaga al proceso que esta corriendo (su pc esta en el cpu del core donde corre)
+    def remainingBurst(self, pcbRunning):
+        core = pcbRunning.getLastCore()
+        if self._predict:
+            return self.nextBurst(pcbRunning) - HARDWARE.timers[core].tickCount
+        return pcbRunning.getProgram().cpuBurstFrom(HARDWARE.cpus[core].pc)
+
+    def mustExpropiate(self, pcbRunning, pcb):
+        return self.nextBurst(pcb) < self.remainingBurst(pcbRunning)
+
+
+#Earliest deadline first: los procesos con deadline (tiempo real) corren antes que el resto, el de deadline mas cercano primero
+#(heap por deadline), y un proceso que llega con un deadline mas cercano que el que corre lo expropia
+#los procesos sin deadline van a una cola FIFO de fondo, que solo corre cuando no hay procesos de tiempo real
+#las tareas periodicas pasan un test de admision: la suma de sus utilizaciones (instrucciones / periodo) no puede pasar maxUtilization
+class SchedulerEDF(Scheduler):
+
+    def __init__(self, maxUtilization = 1.0):
+        self._maxUtilization = maxUtilization
+        self._realTimeQueue = []
+        self._seq = 0
+        self._backgroundQueue = deque()
+        self._utilization = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._deadlineMisses = 0
+        self._missesByProgram = {}
+        #heap (deadline, seq, pcb) de los procesos de tiempo real, para ver en cada tick quien se paso
+        self._deadlines = []
+        self._missed = set()
+
+    def add(self, pcb):
+        if pcb.getDeadline() is None:
+            self._backgroundQueue.append(pcb)
+        else:
+            heapq.heappush(self._realTimeQueue, (pcb.getDeadline(), self._seq, pcb))
+            self._seq += 1
+
+    def nextInQueue(self):
+        if self._realTimeQueue:
+            deadline, seq, pcb = heapq.heappop(self._realTimeQueue)
+            return {'pcb': pcb}
+        return {'pcb': self._backgroundQueue.popleft()}
+
+    def isEmpty(self):
+        return not (self._realTimeQueue or self._backgroundQueue)
+
+    def mustExpropiate(self, pcbRunning, pcb):
+        if pcb.getDeadline() is None:
+            return False
+        return (pcbRunning.getDeadline() is None) or (pcb.getDeadline() < pcbRunning.getDeadline())
+
+    #la utilizacion es el tiempo de cpu sobre el tiempo que tiene para usarlo
+    #(cada instruccion usa un tick de cpu, tambien las de IO y el EXIT: la espera del IO es lo unico que no cuenta)
+    def utilizationOf(self, program, deadline, period):
+        return len(program.instructions) / min(deadline, period)
+
+    def admit(self, program, deadline, period):
+        utilization = self.utilizationOf(program, deadline, period)
+        if self._utilization + utilization > self._maxUtilization:
+            self._rejected += 1
+            return False
+        self._utilization += utilization
+        self._admitted += 1
+        return True
+
+    def withdraw(self, program, deadline, period):
+        self._utilization -= self.utilizationOf(program, deadline, period)
+
+    #el deadline se controla en el tick siguiente (el clock por eventos no lo saltea), no recien cuando termina
+    def created(self, pcb):
+        if pcb.getDeadline() is not None:
+            heapq.heappush(self._deadlines, (pcb.getDeadline(), self._seq, pcb))
+            self._seq += 1
+            HARDWARE.clock.schedule(pcb.getDeadline() + 1, self.checkTick)
+
+    #un proceso que no termino al final del tick de su deadline ya no llega
+    def checkTick(self):
+        currentTick = HARDWARE.clock.currentTick
+        while self._deadlines and (self._deadlines[0][0] < currentTick):
+            deadline, seq, pcb = heapq.heappop(self._deadlines)
+            if pcb.getState() != TERMINATED:
+                self._missDeadline(pcb)
+
+    def terminated(self, pcb):
+        if pcb.getDeadline() is None:
+            return
+        self._completed += 1
+        #el proceso usa el tick de la instruccion EXIT, si termino en el tick del deadline llego a tiempo
+        if pcb in self._missed:
+            self._missed.discard(pcb)
+        elif HARDWARE.clock.currentTick > pcb.getDeadline():
+            self._missDeadline(pcb)
+            self._missed.discard(pcb)
+
+    def _missDeadline(self, pcb):
+        self._missed.add(pcb)
+        self._deadlineMisses += 1
+        name = pcb.getProgram().name
+        self._missesByProgram[name] = self._missesByProgram.get(name, 0) + 1
+        log.logger.info("PID {pid} missed its deadline {deadline} (tick {tick})".format(pid = pcb.getPid(), deadline = pcb.getDeadline(), tick = HARDWARE.clock.currentTick))
+
+    @property
+    def deadlineMisses(self):
+        return self._deadlineMisses
+
+    def stats(self):
+        return {'utilization': self._utilization, 'admitted': self._admitted, 'rejected': self._rejected,
+                'completed': self._completed, 'deadlineMisses': self._deadlineMisses, 'missesByProgram': dict(self._missesByProgram)}
+
+    def __repr__(self):
+        return "SchedulerEDF(realTime={realTime}, background={background})".format(realTime = [(pcb.getPid(), deadline) for deadline, seq, pcb in sorted(self._realTimeQueue)], background = list(self._backgroundQueue))
+
+
+#schedulers de reparto proporcional: cada proceso tiene tickets y se lleva una parte del cpu proporcional a ellos
+#los tickets son las shares del proceso, o si no tiene salen de la prioridad (prioridad 1 es la que mas tiene)
+#como los procesos se reparten el cpu por quantums, el timer siempre esta activo
+class SchedulerProportional(Scheduler):
+
+    def __init__(self, quantum = 3, ticketsPerLevel = 100, levels = 5):
+        self._quantum = quantum
+        self._ticketsPerLevel = ticketsPerLevel
+        self._levels = levels
+
+    def ticketsFor(self, pcb):
+        if pcb.getShares() is not None:
+            return pcb.getShares()
+        return self._ticketsPerLevel * max(1, self._levels + 1 - pcb.getPriority())
+
+    def quantumFor(self, pcb):
+        return self._quantum
+
+
+#Lottery: en cada eleccion se sortea un ticket entre los de los procesos listos (con semilla, para poder repetir corridas)
+#los tickets se guardan en un Fenwick tree (arbol de sumas parciales) indexado por slot, asi sortear, agregar y sacar son O(log n)
+class SchedulerLottery(SchedulerProportional):
+
+    def __init__(self, seed = 0, quantum = 3, ticketsPerLevel = 100, levels = 5):
+        super().__init__(quantum, ticketsPerLevel, levels)
+        self._random = random.Random(seed)
+        self._tree = [0] * 17           # el indice 0 no se usa (los Fenwick tree arrancan en 1)
+        self._slots = [None] * 16       # slot -> (pcb, tickets)
+        self._freeSlots = list(range(15, -1, -1))
+        self._totalTickets = 0
+        self._count = 0
+
+    @property
+    def totalTickets(self):
+        return self._totalTickets
+
+    def add(self, pcb):
+        if not self._freeSlots:
+            self._grow()
+        slot = self._freeSlots.pop()
+        tickets = self.ticketsFor(pcb)
+        self._slots[slot] = (pcb, tickets)
+        self._update(slot, tickets)
+        self._totalTickets += tickets
+        self._count += 1
+
+    def nextInQueue(self):
+        winner = self._random.randrange(self._totalTickets)
+        slot = self._find(winner)
+        pcb, tickets = self._slots[slot]
+        self._slots[slot] = None
+        self._update(slot, -tickets)
+        self._freeSlots.append(slot)
+        self._totalTickets -= tickets
+        self._count -= 1
+        return {'pcb': pcb}
+
+    def isEmpty(self):
+        return self._count == 0
+
+    def _update(self, slot, delta):
+        index = slot + 1
+        while index < len(self._tree):
+            self._tree[index] += delta
+            index += index & -index
+
+    #el primer slot cuya suma acumulada de tickets pasa a winner (se baja por el arbol de a potencias de 2)
+    def _find(self, winner):
+        index = 0
+        step = 1 << (len(self._slots).bit_length() - 1)
+        while step > 0:
+            if (index + step < len(self._tree)) and (self._tree[index + step] <= winner):
+                index += step
+                winner -= self._tree[index]
+            step >>= 1
+        return index
+
+    #se duplica la cantidad de slots y se reconstruye el arbol (O(n), amortizado O(1) por add)
+    def _grow(self):
+        size = len(self._slots)
+        self._slots.extend([None] * size)
+        self._freeSlots.extend(range(2 * size - 1, size - 1, -1))
+        self._tree = [0] * (2 * size + 1)
+        for slot, item in enumerate(self._slots):
+            if item is not None:
+                self._update(slot, item[1])
+
+    def __repr__(self):
+        return "SchedulerLottery({queue})".format(queue = [(item[0].getPid(), item[1]) for item in self._slots if item is not None])
+
+
+#Stride: cada proceso avanza su pass en stride = STRIDE1 / tickets por cada tick que corre, y corre el de menor pass
+#(heap por pass), es el reparto proporcional de lottery pero determinista
+class SchedulerStride(SchedulerProportional):
+
+    STRIDE1 = 1 << 20
+
+    def __init__(self, quantum = 3, ticketsPerLevel = 100, levels = 5):
+        super().__init__(quantum, ticketsPerLevel, levels)
+        self._readyQueue = []
+        self._seq = 0
+        self._passes = {}
+        self._globalPass = 0
+
+    def strideOf(self, pcb):
+        return self.STRIDE1 / self.ticketsFor(pcb)
+
+    def add(self, pcb):
+        #un proceso nuevo o que estuvo bloqueado arranca desde el pass actual (no acumula cpu mientras no compite)
+        passValue = max(self._passes.get(pcb, 0), self._globalPass)
+        self._passes[pcb] = passValue
+        heapq.heappush(self._readyQueue, (passValue, self._seq, pcb))
+        self._seq += 1
+
+    def nextInQueue(self):
+        passValue, seq, pcb = heapq.heappop(self._readyQueue)
+        self._globalPass = max(self._globalPass, passValue)
+        return {'pcb': pcb}
+
+    def isEmpty(self):
+        return not self._readyQueue
+
+    def ran(self, pcb, ticks):
+        self._passes[pcb] = self._passes.get(pcb, self._globalPass) + ticks * self.strideOf(pcb)
+
+    def terminated(self, pcb):
+        self._passes.pop(pcb, None)
+
+    def __repr__(self):
+        return "SchedulerStride({queue})".format(queue = [(pcb.getPid(), passValue) for passValue, seq, pcb in sorted(self._readyQueue)])
+
+
 class DiagramaDeGantt():    
     def __init__(self, pcbtable):
         self._pcbTable = pcbtable       
-        self._pcbTableCopy = []
+        self._rows = []     #[estados, ticks]: los ticks seguidos con los mismos estados se guardan una sola vez
         self._headers = []
         self._isActivated = False
 
@@ -589,9 +1917,10 @@ class DiagramaDeGantt():
     def isActivated(self):
         return(self._isActivated)
     
+    #un elemento por tick
     @property
     def pcbTableCopy(self):
-        return(self._pcbTableCopy)
+        return [states for states, ticks in self._rows for tick in range(ticks)]
     
     @property
     def headers(self):
@@ -604,11 +1933,16 @@ class DiagramaDeGantt():
                 return False
         return True
     
-    def tickInformation(self):
+    def tickInformation(self, ticks = 1):
         arrayPorTick = []
         for pid, pcb in self._pcbTable.getTable().items():       
             arrayPorTick.append(pcb.getState())          #Guarda los estados de todos los pcb de la pcb table por cada tick en un array. ["runnning", "waiting", "ready"]
-        self._pcbTableCopy.append(arrayPorTick)          #cuando ya recorrio todos los estados de todos los programas, lo agrega como una lista a pcTableCopy [["runnning", "waiting", "ready"], []]
+        #cuando ya recorrio todos los estados de todos los programas, lo agrega como una lista a pcTableCopy [["runnning", "waiting", "ready"], []]
+        #si son los mismos estados que el tick anterior solo se suman los ticks
+        if self._rows and (self._rows[-1][0] == arrayPorTick):
+            self._rows[-1][1] += ticks
+        else:
+            self._rows.append([arrayPorTick, ticks])
                                                         #                tick 1                          tick 2
                                                         # ejemplo : [["ready", "waiting", "running"], ["blabla", "blabla", "blabla"]] se guarda los estados de cada programa en cada tick
 
@@ -662,8 +1996,8 @@ class DiagramaDeGantt():
                     nuevaLista.append("R")
         return nuevaLista
                 
-    def doGantt(self): #hacer el diagrama
-        self.tickInformation()
+    def doGantt(self, ticks = 1): #hacer el diagrama
+        self.tickInformation(ticks)
         if(self.isActivated and self.allPCBTerminated()): #si esta activado y todos los pcb terminaron
             self.printGantt() #se hace el diagrama
             self.desactivateGantt() #se desactiva
@@ -671,7 +2005,12 @@ class DiagramaDeGantt():
 
 class Kernel():
 
-    def __init__(self):
+    #demandPaging: con el MMU paginado, las paginas se cargan recien cuando se usan
+    #victimPolicy: con swap, la politica para elegir la pagina a desalojar (FIFO por defecto)
+    #scheduler: la politica de la ready queue (FIFO por defecto)
+    #ioPolicies: el orden en que cada tipo de dispositivo atiende los pedidos (ej: {"Disk": SSTF}, FCFS por defecto)
+    #allocationPolicy: sin paginacion, como el loader elige el bloque libre (FIRST_FIT o BEST_FIT)
+    def __init__(self, demandPaging = False, victimPolicy = None, scheduler = None, ioPolicies = None, allocationPolicy = FIRST_FIT):
         ## setup interruption handlers
         killHandler = KillInterruptionHandler(self)
         HARDWARE.interruptVector.register(KILL_INTERRUPTION_TYPE, killHandler)
@@ -695,22 +2034,51 @@ class Kernel():
         statHandler = StatInterruptionHandler(self) 
         HARDWARE.interruptVector.register(STAT_INTERRUPTION_TYPE, statHandler)
 
+        pageFaultHandler = PageFaultInterruptionHandler(self)
+        HARDWARE.interruptVector.register(PAGE_FAULT_INTERRUPTION_TYPE, pageFaultHandler)
+
+        dmaHandler = DmaInterruptionHandler(self)
+        HARDWARE.interruptVector.register(DMA_INTERRUPTION_TYPE, dmaHandler)
+
         #tp 4
         HARDWARE.cpu.enable_stats = True #para que se active el stats del cpu que esta en hardware
 
-        ## controls the Hardware's I/O Device
-        self._ioDeviceController = IoDeviceController(HARDWARE.ioDevice)
-
         #Constantes - Instanciando objetos de las clases ready_queue y pcb_table, para no crear objetos a cada rato
         #self._READYQUEUE = READY_QUEUE()
-        self._PCBTABLE   = PcbTable()
-        self._DISPATCHER = Dispatcher()
-        self._LOADER = Loader()
+        self._PCBTABLE   = PcbTable(len(HARDWARE.cpus))
+        self._DISPATCHER = Dispatcher(self)
+        #si el MMU esta en modo paginado, la memoria se asigna por frames
+        frameSize = HARDWARE.mmu.frameSize
+        if frameSize is None:
+            self._FRAME_ALLOCATOR = None
+            self._LOADER = Loader(policy = allocationPolicy)
+        else:
+            self._FRAME_ALLOCATOR = FrameAllocator(HARDWARE.memory.size // frameSize)
+            self._LOADER = PagedLoader(self._FRAME_ALLOCATOR, frameSize, demandPaging, HARDWARE.swap, victimPolicy)
+
+        ## controls the Hardware's I/O Devices (un controller, con su cola, por tipo de dispositivo)
+        #si hay varias replicas de un dispositivo, un solo controller las maneja a todas
+        #(los que mueven datos por DMA usan el loader para saber donde esta el proceso en memoria)
+        self._ioDeviceControllers = {}
+        self._controllersByDevice = {}
+        for deviceType, devices in HARDWARE.ioDevicesByType.items():
+            policy = (ioPolicies or {}).get(deviceType, FCFS)
+            if len(devices) == 1:
+                controller = IoDeviceController(devices[0], policy, self._LOADER)
+            else:
+                controller = PooledIoDeviceController(devices, policy, self._LOADER)
+            self._ioDeviceControllers[deviceType] = controller
+            for device in devices:
+                self._controllersByDevice[device.deviceId] = controller
+        self._ioDeviceController = self._ioDeviceControllers[HARDWARE.ioDevice.deviceType]
+
         #tp 4
         self._DIAGRAMA_DE_GANTT = DiagramaDeGantt(self.pcbTable)
         
         #Tp 4
-        self._SCHEDULER = SchedulerFiFo()
+        if scheduler is None:
+            scheduler = SchedulerFiFo()
+        self._SCHEDULER = scheduler
         #self._SCHEDULER = SchedulerPriorityNoExp()
         #self._SCHEDULER = SchedulerRoundRobin()
         #self._SCHEDULER = SchedulerPriorityExp()
@@ -734,10 +2102,30 @@ class Kernel():
     @property
     def loader(self):
         return self._LOADER
+
+    @property
+    def frameAllocator(self):
+        return self._FRAME_ALLOCATOR
     
     @property
     def ioDeviceController(self):
         return self._ioDeviceController
+
+    @property
+    def ioDeviceControllers(self):
+        return self._ioDeviceControllers
+
+    #el controller del tipo de dispositivo dado, al que van las instrucciones IO (None: el dispositivo por defecto)
+    def ioDeviceControllerFor(self, deviceType):
+        if deviceType is None:
+            return self._ioDeviceController
+        if deviceType not in self._ioDeviceControllers:
+            raise Exception("There is no I/O device {id}".format(id = deviceType))
+        return self._ioDeviceControllers[deviceType]
+
+    #el controller que maneja el dispositivo dado (el deviceId de la interrupcion IO_OUT, ej: Printer-2)
+    def ioDeviceControllerOf(self, deviceId):
+        return self._controllersByDevice[deviceId]
     
     #Tp 4
     @property
@@ -749,11 +2137,45 @@ class Kernel():
         return self._DIAGRAMA_DE_GANTT
 
     ## emulates a "system call" for programs execution
-    def run(self, program, priority): #ahora le llega la prioridad para los scheduler de eso
-        parameters = {'program': program, 'priority': priority}
+    #affinity: los cores donde puede correr el proceso (None: cualquiera)
+    #deadline: ticks que tiene para terminar desde que llega (tiempo real)
+    #period: el programa se vuelve a ejecutar cada period ticks (tarea periodica, su deadline por defecto es el periodo)
+    #releases: cuantas veces se libera la tarea periodica (None: sin limite)
+    #shares: la parte del cpu que le toca (schedulers de reparto proporcional)
+    def run(self, program, priority, affinity = None, deadline = None, period = None, shares = None, releases = None): #ahora le llega la prioridad para los scheduler de eso
+        #una afinidad que deja afuera algun core solo se puede respetar con una ready queue por core
+        if (affinity is not None) and not self.scheduler.supportsAffinity() and any(core not in affinity for core in range(len(HARDWARE.cpus))):
+            raise Exception("{scheduler} has a shared ready queue, it can't keep {name} on the cores {affinity}".format(scheduler = self.scheduler.__class__.__name__, name = program.name, affinity = affinity))
+        #se controla antes de crear el proceso (con runAt o periodic el error saldria en otro tick)
+        if (shares is not None) and (isinstance(shares, bool) or not isinstance(shares, int) or (shares <= 0)):
+            raise Exception("Shares {shares} of {name} must be a positive int".format(shares = shares, name = program.name))
+        if (releases is not None) and ((period is None) or not isinstance(releases, int) or (releases < 1)):
+            raise Exception("Releases {releases} of {name} must be a positive int of a periodic task".format(releases = releases, name = program.name))
+        if period is not None:
+            if deadline is None:
+                deadline = period
+            if not self.scheduler.admit(program, deadline, period):
+                raise Exception("Periodic task {name} (deadline={deadline}, period={period}) rejected by the admission test of {scheduler}".format(name = program.name, deadline = deadline, period = period, scheduler = self.scheduler.__class__.__name__))
+        self._release(program, priority, affinity, deadline, period, shares, releases)
+
+    #cada liberacion de una tarea periodica es un proceso nuevo
+    #con la ultima liberacion, la tarea deja de contar para el test de admision cuando llega su deadline
+    def _release(self, program, priority, affinity, deadline, period, shares, releases = None):
+        if period is not None:
+            currentTick = HARDWARE.clock.currentTick
+            if (releases is None) or (releases > 1):
+                left = None if releases is None else releases - 1
+                HARDWARE.clock.schedule(currentTick + period, lambda: self._release(program, priority, affinity, deadline, period, shares, left))
+            else:
+                HARDWARE.clock.schedule(currentTick + deadline, lambda: self.scheduler.withdraw(program, deadline, period))
+        parameters = {'program': program, 'priority': priority, 'affinity': affinity, 'deadline': deadline, 'shares': shares}
         newIRQ = IRQ(NEW_INTERRUPTION_TYPE, parameters)
         HARDWARE.interruptVector.handle(newIRQ)
 
+    ## el programa llega al sistema en el tick dado (es un evento para el clock)
+    def runAt(self, tick, program, priority, affinity = None, deadline = None, period = None, shares = None, releases = None):
+        HARDWARE.clock.schedule(tick, lambda: self.run(program, priority, affinity, deadline, period, shares, releases))
+
     def __repr__(self):
         return "Kernel "
 
@@ -0,0 +1,108 @@
+import unittest
+
+from hardware import *
+from so import *
+
+
+def programs():
+    return [(Program("prg1.exe", [ASM.CPU(2), ASM.IO(), ASM.CPU(3), ASM.IO(), ASM.CPU(2)]), 3),
+            (Program("prg2.exe", [ASM.CPU(7)]), 5),
+            (Program("prg3.exe", [ASM.CPU(4), ASM.IO(), ASM.CPU(1)]), 1),
+            (Program("prg4.exe", [ASM.CPU(9), ASM.IO("Disk"), ASM.CPU(2)]), 4)]
+
+## runs the programs and returns the states of the processes in each tick
+##  mode: "ticks" (every tick), "events" (idle ticks skipped), "burst" (events, cpu bursts in one jump)
+##  or "async" (asyncio clock, the devices post their interruptions)
+##  a last program arrives when the others finished, after some idle ticks
+def gantt(mode, scheduler = None, ticks = 80, cores = 1):
+    HARDWARE.setup(100, virtualTime = True, eventDriven = (mode in ["events", "burst"]), cores = cores, asyncMode = (mode == "async"))
+    for cpu in HARDWARE.cpus:
+        cpu.burstMode = (mode == "burst")
+    kernel = Kernel(scheduler = scheduler() if scheduler else None)
+    kernel.diagramDeGrant.printGantt = lambda: None
+    for program, priority in programs():
+        kernel.run(program, priority)
+    kernel.runAt(40, Program("late.exe", [ASM.CPU(3), ASM.IO(), ASM.CPU(1)]), 1)
+    if mode == "ticks":
+        HARDWARE.clock.do_ticks(ticks)
+    elif mode == "async":
+        HARDWARE.runAsync(ticks)
+    else:
+        HARDWARE.clock.do_events(ticks)
+    return kernel.diagramDeGrant.pcbTableCopy
+
+
+class ClockModesTest(unittest.TestCase):
+
+    def test_event_and_burst_modes_match_every_tick(self):
+        schedulers = [None, SchedulerRoundRobin, SchedulerPriorityNoExp, SchedulerPriorityExp, SchedulerMLFQ, SchedulerCFS, SchedulerSRTF, SchedulerPerCore]
+        for scheduler in schedulers:
+            for cores in [1, 2]:
+                expected = gantt("ticks", scheduler, cores = cores)
+                for mode in ["events", "burst"]:
+                    with self.subTest(scheduler = scheduler, cores = cores, mode = mode):
+                        self.assertEqual(expected, gantt(mode, scheduler, cores = cores))
+
+    def test_program_arriving_at_an_idle_cpu_runs_to_the_end(self):
+        ## late.exe blocks on IO with nothing else to run, the cpu is free when its IO finishes
+        self.assertEqual(["terminated"] * 5, gantt("events")[-1])
+
+    def test_gantt_stores_a_skipped_range_once(self):
+        HARDWARE.setup(1000, virtualTime = True, eventDriven = True)
+        HARDWARE.cpu.burstMode = True
+        kernel = Kernel()
+        kernel.diagramDeGrant.printGantt = lambda: None
+        kernel.run(Program("long.exe", ASM.CPU(900)), 1)
+        HARDWARE.clock.do_events(1000000)
+        rows = kernel.diagramDeGrant._rows
+        self.assertEqual([["running"], ["terminated"]], [states for states, ticks in rows])
+        self.assertEqual(1000000, sum(ticks for states, ticks in rows))
+
+    def test_aging_deadline_is_a_clock_event(self):
+        HARDWARE.setup(100, virtualTime = True, eventDriven = True)
+        HARDWARE.cpu.burstMode = True
+        kernel = Kernel(scheduler = SchedulerPriorityNoExp(aging = 4))
+        kernel.diagramDeGrant.printGantt = lambda: None
+        kernel.run(Program("first.exe", ASM.CPU(20)), 1)
+        kernel.run(Program("waiting.exe", ASM.CPU(3)), 5)
+        ## the burst of first.exe would jump to tick 20, the aging deadline stops it at 4
+        self.assertEqual(4, HARDWARE.clock.nextEventTick(0))
+
+
+## records the interruptions it handles
+
+
+## records the interruptions it handles
+class RecordingHandler():
+
+    def __init__(self, handled):
+        self._handled = handled
+
+    def execute(self, irq):
+        self._handled.append(irq.parameters)
+
+
+class AsyncModeTest(unittest.TestCase):
+
+    def test_async_mode_matches_every_tick(self):
+        schedulers = [None, SchedulerRoundRobin, SchedulerPriorityNoExp, SchedulerPriorityExp, SchedulerMLFQ, SchedulerCFS, SchedulerSRTF, SchedulerPerCore]
+        for scheduler in schedulers:
+            for cores in [1, 2]:
+                with self.subTest(scheduler = scheduler, cores = cores):
+                    self.assertEqual(gantt("ticks", scheduler, cores = cores), gantt("async", scheduler, cores = cores))
+
+    def test_timer_tick_drains_the_posted_interruptions_in_order(self):
+        HARDWARE.setup(10, virtualTime = True, asyncMode = True)
+        handled = []
+        HARDWARE.interruptVector.register("#TEST", RecordingHandler(handled))
+        for number in range(0, 3):
+            HARDWARE.interruptVector.post(IRQ("#TEST", number), lambda number = number: handled.append("ack {number}".format(number = number)))
+        ## nothing is handled until the instruction boundary
+        self.assertEqual([], handled)
+        HARDWARE.timer.tick(0)
+        self.assertEqual(["ack 0", 0, "ack 1", 1, "ack 2", 2], handled)
+        self.assertFalse(HARDWARE.interruptVector.hasPending)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from hardware import *
+from so import *
+
+
+## runs a program on the hardware the setup builds, and returns the states of the processes in each tick
+def states(**setup):
+    HARDWARE.setup(100, virtualTime = True, **setup)
+    kernel = Kernel()
+    kernel.diagramDeGrant.printGantt = lambda: None
+    kernel.run(Program("prg1.exe", [ASM.CPU(2), ASM.IO(), ASM.CPU(3)]), 1)
+    kernel.run(Program("prg2.exe", [ASM.CPU(4)]), 1)
+    HARDWARE.clock.do_ticks(20)
+    return kernel.diagramDeGrant.pcbTableCopy
+
+
+class SwitchOffTest(unittest.TestCase):
+
+    def test_mapped_memory_runs_the_same_programs(self):
+        self.assertEqual(states(), states(backingFile = os.path.join(tempfile.mkdtemp(), "ram")))
+
+    def test_switch_off_closes_the_memory_file(self):
+        directory = tempfile.mkdtemp()
+        HARDWARE.setup(64, virtualTime = True, backingFile = os.path.join(directory, "ram"))
+        HARDWARE.memory.writeBlock(0, ASM.CPU(3))
+        HARDWARE.switchOff()
+        self.assertTrue(HARDWARE.memory._file.closed)
+        with open(os.path.join(directory, "ram"), 'rb') as ram:
+            self.assertEqual(bytes([OPCODE_CPU] * 3), ram.read(3))
+
+    def test_switch_off_closes_the_swap_file(self):
+        HARDWARE.setup(64, virtualTime = True, frameSize = 4, swapFile = os.path.join(tempfile.mkdtemp(), "swap"))
+        HARDWARE.switchOff()
+        self.assertTrue(HARDWARE.swap._file.closed)
+
+    def test_switch_off_closes_the_device_files(self):
+        directory = tempfile.mkdtemp()
+        devices = [FileIODevice(os.path.join(directory, "file")), BlockIODevice(os.path.join(directory, "block"))]
+        HARDWARE.setup(64, virtualTime = True, ioDevices = [PrinterIODevice()] + devices)
+        HARDWARE.switchOff()
+        self.assertTrue(all(device._file.closed for device in devices))
+
+    def test_block_device_keeps_the_data_of_an_existing_file(self):
+        path = os.path.join(tempfile.mkdtemp(), "block")
+        block = BlockIODevice(path, blocks = 2, blockSize = 4)
+        block.write(0, b'data')
+        block.close()
+        block = BlockIODevice(path, blocks = 4, blockSize = 4)
+        self.assertEqual(b'data', block.read(0, 4))
+        self.assertEqual(16, os.path.getsize(path))
+        block.close()
+
+    def test_switch_off_waits_for_the_last_tick(self):
+        HARDWARE.setup(64, virtualTime = True, backingFile = os.path.join(tempfile.mkdtemp(), "ram"))
+        HARDWARE.switchOn()
+        HARDWARE.switchOff()
+        ## the clock thread is done before the memory is closed
+        self.assertFalse(HARDWARE.clock._thread.is_alive())
+        self.assertTrue(HARDWARE.memory._file.closed)
+
+
+class PooledControllerTest(unittest.TestCase):
+
+    def test_requests_go_to_any_idle_replica(self):
+        HARDWARE.setup(10, virtualTime = True)
+        printers = [PrinterIODevice(replica) for replica in [1, 2]]
+        controller = PooledIoDeviceController(printers)
+        pcbs = [PCB(pid, 0, 3, WAITING, 1) for pid in range(0, 3)]
+        for pcb in pcbs:
+            controller.runOperation(pcb, ASM.IO())
+        ## both replicas are busy at the same time, the third request waits
+        self.assertTrue(all(printer.is_busy for printer in printers))
+        self.assertEqual(1, controller.stats()['waiting'])
+        ## the replica that finishes first takes the waiting request
+        for tick in range(0, 4):
+            printers[1].tick(tick)
+        self.assertTrue(printers[1].is_idle)
+        self.assertEqual(pcbs[1], controller.getFinishedPCB("Printer-2"))
+        self.assertEqual(0, controller.stats()['waiting'])
+        self.assertEqual(pcbs[0], controller.getFinishedPCB("Printer-1"))
+        with self.assertRaises(Exception):
+            controller.getFinishedPCB("Printer-1")
+
+    def test_replicas_serve_the_processes_concurrently(self):
+        waits = []
+        for replicas in [1, 2]:
+            HARDWARE.setup(100, virtualTime = True, cores = 2, ioReplicas = {'Printer': replicas})
+            kernel = Kernel()
+            kernel.diagramDeGrant.printGantt = lambda: None
+            for i in range(0, 4):
+                kernel.run(Program("print{i}.exe".format(i = i), ASM.CPU(1) + [ASM.IO()] + ASM.CPU(1)), 1)
+            HARDWARE.clock.do_ticks(40)
+            self.assertTrue(kernel.diagramDeGrant.allPCBTerminated())
+            waits.append(kernel.ioDeviceController.stats()['averageWait'])
+        self.assertLess(waits[1], waits[0])
+
+
+class DiskTest(unittest.TestCase):
+
+    def test_many_cylinders_share_one_opcode(self):
+        disk = DiskIODevice(cylinders = 1000)
+        HARDWARE.setup(1000, virtualTime = True, eventDriven = True, compactMemory = True, ioDevices = [PrinterIODevice(), disk])
+        kernel = Kernel()
+        kernel.diagramDeGrant.printGantt = lambda: None
+        served = []
+        execute = disk.execute
+        disk.execute = lambda operation, cylinder = None, via = None: served.append(cylinder) or execute(operation, cylinder, via)
+        cylinders = list(range(0, 1000, 3))
+        kernel.run(Program("seek.exe", [ASM.CPU(1) + [ASM.IO("Disk", cylinder)] for cylinder in cylinders]), 1)
+        HARDWARE.clock.do_events(5000)
+        self.assertTrue(kernel.diagramDeGrant.allPCBTerminated())
+        ## every cylinder reaches the disk, and all of them run with the opcode of 'IO:Disk'
+        self.assertEqual(cylinders, served)
+        self.assertEqual(ASM.opcode(ASM.IO("Disk")), ASM.opcode(ASM.IO("Disk", 999)))
+
+    def test_scan_sweeps_each_pooled_disk_on_its_own(self):
+        HARDWARE.setup(10, virtualTime = True)
+        disks = [DiskIODevice(replica, cylinders = 1000) for replica in [1, 2]]
+        controller = PooledIoDeviceController(disks, SCAN)
+        disks[1].execute(ASM.IO("Disk", 900), 900)
+        for cylinder in [100, 500]:
+            controller._waiting_queue.append((cylinder, cylinder, {'cylinder': cylinder}))
+        ## nothing above the head of the second disk: it turns around at the end
+        pair, via = controller._popNext(disks[1])
+        self.assertEqual((500, 999), (pair['cylinder'], via))
+        ## the first disk is still going up from cylinder 0
+        pair, via = controller._popNext(disks[0])
+        self.assertEqual((100, None), (pair['cylinder'], via))
+
+
+class OpcodeTest(unittest.TestCase):
+
+    def test_persisted_image_means_the_same_in_a_new_run(self):
+        path = os.path.join(tempfile.mkdtemp(), "ram")
+        program = ASM.CPU(1) + [ASM.IO("Network"), ASM.IO("Disk"), ASM.IO("Printer")] + ASM.EXIT(1)
+        HARDWARE.setup(8, virtualTime = True, backingFile = path)
+        HARDWARE.memory.writeBlock(0, program)
+        HARDWARE.switchOff()
+        ## a new run, that uses the devices in another order, reads the image with its own table
+        script = "from hardware import *; ASM.opcode(ASM.IO('Disk')); print(ASM.decode(open({path!r}, 'rb').read(5)))".format(path = path)
+        output = subprocess.run([sys.executable, "-c", script], cwd = os.path.dirname(os.path.abspath(__file__)), capture_output = True, text = True, check = True).stdout
+        self.assertEqual(repr(program), output.strip())
+
+    def test_unknown_bytes_and_devices(self):
+        with self.assertRaisesRegex(Exception, "Unknown opcode"):
+            ASM.instruction(200)
+        with self.assertRaisesRegex(Exception, "DEVICE_OPCODES"):
+            ASM.opcode(ASM.IO("Tape"))
+        ## data bytes are kept as they are
+        self.assertEqual([INSTRUCTION_CPU, 5, ASM.IO("Disk")], ASM.decode(bytes([OPCODE_CPU, 5, DEVICE_OPCODES["Disk"]])))
+        self.assertFalse(ASM.isIOOpcode(200))
+
+
+if __name__ == '__main__':
+    unittest.main()
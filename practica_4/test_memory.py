@@ -0,0 +1,149 @@
+import os
+import tempfile
+import unittest
+
+from hardware import *
+from so import *
+
+
+class LoaderTest(unittest.TestCase):
+
+    ## leaves the free blocks [0, 10], [13, 5] and [20, 10] and loads a 4 cells program
+    def loadWith(self, allocationPolicy):
+        HARDWARE.setup(30, virtualTime = True)
+        kernel = Kernel(allocationPolicy = allocationPolicy)
+        for size in [10, 3, 5, 2]:
+            kernel.loader.allocate(size)
+        kernel.loader.release(0, 10)
+        kernel.loader.release(13, 5)
+        kernel.run(Program("small.exe", ASM.CPU(3)), 1)
+        return kernel.pcbTable.getRunningPCB().getBaseDir()
+
+    def test_kernel_selects_the_allocation_policy(self):
+        self.assertEqual(0, self.loadWith(FIRST_FIT))
+        self.assertEqual(13, self.loadWith(BEST_FIT))
+
+    def test_terminated_processes_give_their_memory_back(self):
+        HARDWARE.setup(30, virtualTime = True)
+        kernel = Kernel()
+        kernel.diagramDeGrant.printGantt = lambda: None
+        for size in [5, 9, 3]:
+            kernel.run(Program("prg{size}.exe".format(size = size), ASM.CPU(size - 1)), 1)
+        ## the three programs use 17 cells, the 18 cells of the fourth one are one block again when they finish
+        kernel.runAt(20, Program("big.exe", ASM.CPU(17)), 1)
+        HARDWARE.clock.do_ticks(60)
+        self.assertTrue(kernel.diagramDeGrant.allPCBTerminated())
+        self.assertEqual({'freeCells': 30, 'freeBlocks': 1, 'largestFreeBlock': 30, 'externalFragmentation': 0}, kernel.loader.fragmentationStats())
+
+
+class BurstTlbTest(unittest.TestCase):
+
+    ## TLB stats and referenced bits after running the programs, with every tick or with cpu bursts
+    def runWith(self, burstMode):
+        HARDWARE.setup(64, virtualTime = True, eventDriven = burstMode, frameSize = 4, tlbSize = 2)
+        HARDWARE.cpu.burstMode = burstMode
+        kernel = Kernel(scheduler = SchedulerRoundRobin())
+        kernel.diagramDeGrant.printGantt = lambda: None
+        for name, instructions in [("a.exe", ASM.CPU(9) + [ASM.IO()] + ASM.CPU(6)), ("b.exe", ASM.CPU(13)), ("c.exe", ASM.CPU(2) + [ASM.IO()] + ASM.CPU(10))]:
+            kernel.run(Program(name, instructions), 1)
+        if burstMode:
+            HARDWARE.clock.do_events(60)
+        else:
+            HARDWARE.clock.do_ticks(60)
+        referenced = [[entry.referenced for entry in pcb.getPageTable()] for pid, pcb in sorted(kernel.pcbTable.getTable().items())]
+        return HARDWARE.mmu.tlb.stats(), referenced
+
+    def test_burst_mode_does_not_change_the_tlb_stats(self):
+        self.assertEqual(self.runWith(False), self.runWith(True))
+
+
+class SwapTest(unittest.TestCase):
+
+    def programs(self):
+        return [Program("a.exe", ASM.CPU(5) + [ASM.IO()] + ASM.CPU(6)), Program("b.exe", ASM.CPU(3) + [ASM.IO()] + ASM.CPU(8)),
+                Program("c.exe", ASM.CPU(10) + [ASM.IO()] + ASM.CPU(1))]
+
+    ## memorySize 8: 2 frames for 9 pages, the pages go to the swap and back
+    def runWith(self, memorySize, swapFile = None, victimPolicy = None):
+        HARDWARE.setup(memorySize, virtualTime = True, frameSize = 4, swapFile = swapFile)
+        kernel = Kernel(demandPaging = True, victimPolicy = victimPolicy, scheduler = SchedulerRoundRobin())
+        kernel.diagramDeGrant.printGantt = lambda: None
+        for program in self.programs():
+            kernel.run(program, 1)
+        HARDWARE.clock.do_ticks(60)
+        return kernel
+
+    def test_evicted_pages_are_paged_out_and_in(self):
+        expected = self.runWith(64).diagramDeGrant.transposedArray()
+        for victimPolicy in [FifoVictimPolicy, SecondChanceVictimPolicy, LruApproxVictimPolicy]:
+            with self.subTest(victimPolicy = victimPolicy):
+                swapFile = os.path.join(tempfile.mkdtemp(), "swap")
+                kernel = self.runWith(8, swapFile, victimPolicy())
+                stats = kernel.loader.swapStats()
+                self.assertGreater(stats['pageOuts'], 0)
+                self.assertGreater(stats['pageIns'], 0)
+                self.assertGreater(os.path.getsize(swapFile), 0)
+                ## the pages read back from the swap run the same instructions as with enough memory
+                self.assertEqual(expected, kernel.diagramDeGrant.transposedArray())
+
+
+class DmaTest(unittest.TestCase):
+
+    def test_transfer_keeps_the_offsets_of_the_pages_not_in_memory(self):
+        directory = tempfile.mkdtemp()
+        block = BlockIODevice(os.path.join(directory, "block"), blocks = 4, blockSize = 16)
+        HARDWARE.setup(16, virtualTime = True, frameSize = 4, swapFile = os.path.join(directory, "swap"), ioDevices = [PrinterIODevice(), block])
+        kernel = Kernel(demandPaging = True)
+        kernel.diagramDeGrant.printGantt = lambda: None
+        ## only the first page of copy.exe is in memory when it reaches the IO
+        program = Program("copy.exe", ASM.CPU(1) + [ASM.IO("Block")] + ASM.CPU(9))
+        kernel.run(program, 1)
+        kernel.run(Program("other.exe", ASM.CPU(10)), 1)
+        HARDWARE.clock.do_ticks(60)
+        self.assertTrue(kernel.diagramDeGrant.allPCBTerminated())
+        self.assertEqual(program.opcodes, block.read(0, len(program.instructions)))
+
+    def test_no_victim_when_every_frame_is_pinned(self):
+        for policy in [FifoVictimPolicy(), SecondChanceVictimPolicy(), LruApproxVictimPolicy()]:
+            with self.subTest(policy = policy):
+                for frame in range(0, 2):
+                    policy.add(frame, PageTableEntry())
+                    policy.pin(frame)
+                with self.assertRaisesRegex(Exception, "pinned"):
+                    policy.chooseVictim()
+
+    def test_unpinned_frame_keeps_its_place(self):
+        for policy in [FifoVictimPolicy(), SecondChanceVictimPolicy(), LruApproxVictimPolicy()]:
+            with self.subTest(policy = policy):
+                for frame in range(0, 3):
+                    policy.add(frame, PageTableEntry())
+                policy.pin(0)
+                self.assertEqual(1, policy.chooseVictim())
+                policy.unpin(0)
+                self.assertEqual(0, policy.chooseVictim())
+
+    def test_async_dma_posts_its_interruption(self):
+        block = BlockIODevice(os.path.join(tempfile.mkdtemp(), "block"), blocks = 1, blockSize = 4)
+        HARDWARE.setup(16, virtualTime = True, asyncMode = True, ioDevices = [PrinterIODevice(), block])
+        HARDWARE.dma.transfer(block, ASM.IO("Block"), [(0, 4)])
+        HARDWARE.dma.tick(0)
+        ## the device is busy until the cpu takes the #DMA
+        self.assertTrue(HARDWARE.interruptVector.hasPending)
+        self.assertFalse(block.is_idle)
+        HARDWARE.interruptVector.drain()
+        self.assertTrue(block.is_idle)
+
+    def test_dma_reads_data_bytes_into_the_memory(self):
+        block = BlockIODevice(os.path.join(tempfile.mkdtemp(), "block"), blocks = 1, blockSize = 4)
+        data = bytes([OPCODE_CPU, 5, 200, OPCODE_EXIT])
+        block.write(0, data)
+        HARDWARE.setup(16, virtualTime = True, ioDevices = [PrinterIODevice(), block])
+        HARDWARE.dma.transfer(block, ASM.IO("Block"), [(2, 4)], toMemory = True)
+        HARDWARE.dma.tick(0)
+        ## the bytes that are not opcodes are kept as they are, and go back to a device unchanged
+        self.assertEqual([INSTRUCTION_CPU, 5, 200, INSTRUCTION_EXIT], HARDWARE.memory.readBlock(2, 4))
+        self.assertEqual(data, ASM.encode(HARDWARE.memory.readBlock(2, 4)))
+
+
+if __name__ == '__main__':
+    unittest.main()
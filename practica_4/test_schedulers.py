@@ -0,0 +1,189 @@
+import unittest
+
+from hardware import *
+from so import *
+
+
+def kernelWith(scheduler = None, cores = 1, memorySize = 200):
+    HARDWARE.setup(memorySize, virtualTime = True, cores = cores)
+    kernel = Kernel(scheduler = scheduler() if scheduler else None)
+    kernel.diagramDeGrant.printGantt = lambda: None
+    return kernel
+
+
+class AffinityTest(unittest.TestCase):
+
+    def test_shared_ready_queue_rejects_a_restricting_affinity(self):
+        kernel = kernelWith(SchedulerFiFo, cores = 2)
+        with self.assertRaises(Exception):
+            kernel.run(Program("pinned.exe", ASM.CPU(3)), 1, affinity = [1])
+        ## an affinity with every core doesn't restrict anything
+        kernel.run(Program("any.exe", ASM.CPU(3)), 1, affinity = [0, 1])
+
+    def test_per_core_scheduler_keeps_the_processes_on_their_cores(self):
+        kernel = kernelWith(SchedulerPerCore, cores = 2)
+        for i in range(0, 6):
+            kernel.run(Program("pinned{i}.exe".format(i = i), ASM.CPU(2) + [ASM.IO()] + ASM.CPU(2)), 1, affinity = [1])
+        cores = {}
+        for tick in range(0, 80):
+            HARDWARE.clock.tick(tick)
+            for core, pcb in enumerate(kernel.pcbTable.getRunningPCBs()):
+                if pcb is not None:
+                    cores.setdefault(pcb.getPid(), set()).add(core)
+        self.assertEqual(6, len(cores))
+        self.assertTrue(all(ran == {1} for ran in cores.values()))
+
+    def test_steal_searches_the_queues_once(self):
+        kernelWith(cores = 2)
+        scheduler = SchedulerPerCore()
+        ## the queues get PIDs 0, 2 (core 0) and 1, 3 (core 1)
+        for pid in range(0, 4):
+            scheduler.add(PCB(pid, 0, 3, READY, 1))
+        searches = []
+        search = scheduler._searchStealable
+        scheduler._searchStealable = lambda core: searches.append(core) or search(core)
+        self.assertEqual([1, 3], [scheduler.nextInQueueFor(1)['pcb'].getPid() for i in range(0, 2)])
+        self.assertEqual([], searches)
+        ## core 1 is empty: it looks for a process to steal once, and steals the last one of core 0
+        self.assertFalse(scheduler.isEmptyFor(1))
+        self.assertEqual(2, scheduler.nextInQueueFor(1)['pcb'].getPid())
+        self.assertEqual([1], searches)
+        ## the queues changed, the next search is a new one
+        self.assertFalse(scheduler.isEmptyFor(1))
+        self.assertEqual([1, 1], searches)
+
+
+class PriorityBitmapTest(unittest.TestCase):
+
+    def test_highest_priority_first_and_fifo_within_a_level(self):
+        kernelWith()
+        scheduler = SchedulerPriorityNoExp()
+        self.assertTrue(scheduler.isEmpty())
+        for pid, priority in [(0, 3), (1, 5), (2, 1), (3, 3)]:
+            scheduler.add(PCB(pid, 0, 3, READY, priority))
+        self.assertEqual([2, 0, 3, 1], [scheduler.nextInQueue()['pcb'].getPid() for i in range(0, 4)])
+        ## the bit of each level goes off when its queue is empty
+        self.assertTrue(scheduler.isEmpty())
+
+    def test_priority_out_of_range(self):
+        kernelWith()
+        scheduler = SchedulerPriorityNoExp(levels = 3)
+        with self.assertRaises(Exception):
+            scheduler.add(PCB(0, 0, 3, READY, 4))
+
+
+class PriorityAgingTest(unittest.TestCase):
+
+    def test_aged_entries_dont_pile_up_in_the_lower_queues(self):
+        HARDWARE.setup(10, virtualTime = True)
+        scheduler = SchedulerPriorityNoExp(levels = 5, aging = 1)
+        ## a process of the lowest priority arrives every tick and nobody is taken from the ready queue
+        for tick in range(0, 500):
+            HARDWARE.clock.tick(tick)
+            scheduler.add(PCB(tick, 0, 1, READY, 5))
+        for level in range(1, 5):
+            self.assertLessEqual(len(scheduler._readyQueue[level]), 2 * scheduler._counts[level] + 1)
+        ## every process is still taken once, by arrival order
+        self.assertEqual(list(range(0, 500)), [scheduler.nextInQueue()['pcb'].getPid() for i in range(0, 500)])
+        self.assertTrue(scheduler.isEmpty())
+
+
+class TerminatedTest(unittest.TestCase):
+
+    ## the scheduler doesn't keep anything of the processes that finished
+    def runAll(self, scheduler, state):
+        kernel = kernelWith(lambda: scheduler)
+        for i in range(0, 4):
+            kernel.run(Program("prg{i}.exe".format(i = i), ASM.CPU(3 + i) + [ASM.IO()] + ASM.CPU(5)), 1)
+        HARDWARE.clock.do_ticks(120)
+        self.assertTrue(kernel.diagramDeGrant.allPCBTerminated())
+        for name in state:
+            self.assertEqual({}, getattr(scheduler, name))
+
+    def test_mlfq_forgets_the_levels(self):
+        self.runAll(SchedulerMLFQ(quanta = (1, 2), boostInterval = 1000), ['_pcbLevels'])
+
+    def test_sjf_forgets_the_predictions(self):
+        self.runAll(SchedulerSJF(predict = True), ['_predictions', '_currentBursts'])
+        self.runAll(SchedulerSRTF(predict = True), ['_predictions', '_currentBursts'])
+
+
+class EdfTest(unittest.TestCase):
+
+    def test_admission_counts_every_instruction(self):
+        kernel = kernelWith(SchedulerEDF)
+        ## the IO instructions and the EXIT use a tick of cpu too, only the wait for the device doesn't
+        program = Program("io.exe", ASM.CPU(2) + [ASM.IO(), ASM.IO(), ASM.IO()] + ASM.CPU(2))
+        kernel.run(program, 1, period = 10, releases = 1)
+        self.assertAlmostEqual(0.8, kernel.scheduler.stats()['utilization'])
+        HARDWARE.clock.do_ticks(40)
+        [pcb] = kernel.pcbTable.getTable().values()
+        self.assertEqual(8, pcb.getCpuTime())
+
+    def test_admitted_tasks_meet_their_deadlines(self):
+        kernel = kernelWith(SchedulerEDF, memorySize = 1000)
+        kernel.run(Program("io.exe", ASM.CPU(1) + [ASM.IO()] + ASM.CPU(1)), 1, period = 10)
+        kernel.run(Program("cpu.exe", ASM.CPU(2)), 1, period = 5)
+        self.assertAlmostEqual(1.0, kernel.scheduler.stats()['utilization'])
+        ## a task that would take more than the cpu left is rejected
+        with self.assertRaises(Exception):
+            kernel.run(Program("more.exe", ASM.CPU(1)), 1, period = 10)
+        HARDWARE.clock.do_ticks(200)
+        self.assertEqual(60, kernel.scheduler.stats()['completed'])
+        self.assertEqual(0, kernel.scheduler.deadlineMisses)
+
+    def test_periodic_task_stops_after_its_releases(self):
+        kernel = kernelWith(SchedulerEDF)
+        kernel.run(Program("periodic.exe", ASM.CPU(2)), 1, period = 5, releases = 3)
+        HARDWARE.clock.do_ticks(40)
+        self.assertEqual(3, len(kernel.pcbTable.getTable()))
+        self.assertEqual(3, kernel.scheduler.stats()['completed'])
+        ## the task doesn't use its part of the cpu anymore
+        self.assertAlmostEqual(0, kernel.scheduler.stats()['utilization'])
+        with self.assertRaises(Exception):
+            kernel.run(Program("periodic.exe", ASM.CPU(2)), 1, period = 5, releases = 0)
+
+    def test_deadline_miss_is_seen_on_the_tick_after_the_deadline(self):
+        for eventDriven in [False, True]:
+            with self.subTest(eventDriven = eventDriven):
+                HARDWARE.setup(100, virtualTime = True, eventDriven = eventDriven)
+                HARDWARE.cpu.burstMode = eventDriven
+                kernel = Kernel(scheduler = SchedulerEDF())
+                kernel.diagramDeGrant.printGantt = lambda: None
+                kernel.run(Program("late.exe", ASM.CPU(20)), 1, deadline = 5)
+                if eventDriven:
+                    HARDWARE.clock.do_events(7)
+                else:
+                    HARDWARE.clock.do_ticks(7)
+                self.assertEqual(1, kernel.scheduler.deadlineMisses)
+                for tick in range(7, 40):
+                    HARDWARE.clock.tick(tick)
+                ## it is counted once, not again when it finishes
+                self.assertEqual({'completed': 1, 'deadlineMisses': 1}, {key: kernel.scheduler.stats()[key] for key in ['completed', 'deadlineMisses']})
+
+
+class SharesTest(unittest.TestCase):
+
+    def test_shares_must_be_positive_ints(self):
+        kernel = kernelWith(SchedulerLottery)
+        for shares in [0, -3, 2.5, True, "3"]:
+            with self.subTest(shares = shares):
+                with self.assertRaises(Exception):
+                    kernel.run(Program("shares.exe", ASM.CPU(3)), 1, shares = shares)
+                with self.assertRaises(Exception):
+                    PCB(0, 0, 0, NEW, 1).setShares(shares)
+        self.assertEqual(0, len(kernel.pcbTable.getTable()))
+
+    def test_cpu_is_shared_by_tickets(self):
+        for scheduler in [SchedulerLottery, SchedulerStride]:
+            with self.subTest(scheduler = scheduler):
+                kernel = kernelWith(scheduler, memorySize = 6010)
+                for shares in [1, 3]:
+                    kernel.run(Program("shares{shares}.exe".format(shares = shares), ASM.CPU(3000)), 1, shares = shares)
+                HARDWARE.clock.do_ticks(3000)
+                cpuTimes = [pcb.getCpuTime() + (HARDWARE.timer.tickCount if pcb.getState() == RUNNING else 0) for pid, pcb in sorted(kernel.pcbTable.getTable().items())]
+                self.assertAlmostEqual(3, cpuTimes[1] / cpuTimes[0], delta = 0.6)
+
+
+if __name__ == '__main__':
+    unittest.main()